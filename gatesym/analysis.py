@@ -0,0 +1,221 @@
+""" structural analysis of frozen networks, these work on the CSR link arrays built by core.Network.freeze """
+
+import bisect
+import collections
+import math
+from array import array
+
+Levels = collections.namedtuple('Levels', 'order positions component_starts component_ends feedback ranks')
+
+
+def strongly_connected_components(fan_out_offsets, fan_out):
+    """
+    Tarjan's algorithm, iterative so long chains of logic don't hit the recursion limit
+    returns a list of components, each a list of gate indexes, in topological order
+    """
+    size = len(fan_out_offsets) - 1
+    index = array('i', [-1]) * size
+    low = array('i', [0]) * size
+    on_stack = bytearray(size)
+    stack = []
+    components = []
+    counter = 0
+
+    for root in range(size):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, fan_out_offsets[root])]
+
+        while work:
+            gate, position = work[-1]
+            if position < fan_out_offsets[gate + 1]:
+                work[-1] = gate, position + 1
+                output = fan_out[position]
+                if index[output] == -1:
+                    index[output] = low[output] = counter
+                    counter += 1
+                    stack.append(output)
+                    on_stack[output] = True
+                    work.append((output, fan_out_offsets[output]))
+                elif on_stack[output] and index[output] < low[gate]:
+                    low[gate] = index[output]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[gate] < low[parent]:
+                        low[parent] = low[gate]
+                if low[gate] == index[gate]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == gate:
+                            break
+                    components.append(component)
+
+    # Tarjan finds components sinks first
+    components.reverse()
+    return components
+
+
+def is_acyclic(fan_out_offsets, fan_out):
+    """ whether there are no loops, so every gate settles to a function of the inputs alone """
+    for gate in range(len(fan_out_offsets) - 1):
+        if gate in fan_out[fan_out_offsets[gate]:fan_out_offsets[gate + 1]]:
+            return False
+    return all(len(component) == 1 for component in strongly_connected_components(fan_out_offsets, fan_out))
+
+
+def _order_component(component, component_index, component_of, fan_in_offsets, fan_in, fan_out_offsets, fan_out):
+    """
+    depth first order the gates of a strongly connected component starting from where signals enter it
+    so the only links that point backwards are the ones that close loops
+    """
+    entries = [
+        gate for gate in component
+        if any(component_of[i] != component_index for i in fan_in[fan_in_offsets[gate]:fan_in_offsets[gate + 1]])
+    ]
+    seen = set()
+    postorder = []
+    for root in sorted(entries) + component:
+        if root in seen:
+            continue
+        seen.add(root)
+        work = [(root, fan_out_offsets[root])]
+        while work:
+            gate, position = work[-1]
+            if position < fan_out_offsets[gate + 1]:
+                work[-1] = gate, position + 1
+                output = fan_out[position]
+                if component_of[output] == component_index and output not in seen:
+                    seen.add(output)
+                    work.append((output, fan_out_offsets[output]))
+            else:
+                work.pop()
+                postorder.append(gate)
+    postorder.reverse()
+    return postorder
+
+
+def levelize(fan_in_offsets, fan_in, fan_out_offsets, fan_out):
+    """
+    work out an evaluation order for the network
+
+    order: every gate, each after all it's inputs except along links that close a loop
+    positions: the position of each gate in order
+    component_starts, component_ends: the strongly connected components as slices of order, in topological order
+    feedback: for each gate the earliest position it links back to, or -1 if all it's outputs come later in order
+    ranks: the logic depth of each gate, gates in the same component share a rank
+    """
+    size = len(fan_out_offsets) - 1
+    fan_in = memoryview(fan_in)
+    fan_out = memoryview(fan_out)
+    components = strongly_connected_components(fan_out_offsets, fan_out)
+
+    component_of = array('i', [0]) * size
+    for component_index, component in enumerate(components):
+        for gate in component:
+            component_of[gate] = component_index
+
+    order = array('i')
+    component_starts = []
+    component_ends = []
+    ranks = array('i', [0]) * size
+    for component_index, component in enumerate(components):
+        if len(component) > 1:
+            component = _order_component(
+                component, component_index, component_of, fan_in_offsets, fan_in, fan_out_offsets, fan_out,
+            )
+        rank = 0
+        for gate in component:
+            for input_ in fan_in[fan_in_offsets[gate]:fan_in_offsets[gate + 1]]:
+                if component_of[input_] != component_index and ranks[input_] >= rank:
+                    rank = ranks[input_] + 1
+        for gate in component:
+            ranks[gate] = rank
+        component_starts.append(len(order))
+        order.extend(component)
+        component_ends.append(len(order))
+
+    positions = array('i', [0]) * size
+    for position, gate in enumerate(order):
+        positions[gate] = position
+
+    feedback = array('i', [-1]) * size
+    for gate in range(size):
+        position = positions[gate]
+        for output in fan_out[fan_out_offsets[gate]:fan_out_offsets[gate + 1]]:
+            if positions[output] <= position and (feedback[gate] == -1 or positions[output] < feedback[gate]):
+                feedback[gate] = positions[output]
+
+    return Levels(order, positions, component_starts, component_ends, feedback, ranks)
+
+
+def loop_free_depths(fan_in_offsets, fan_in, levels):
+    """ the logic depth of each gate ignoring links that close loops, gates with no inputs are depth 1 """
+    positions = levels.positions
+    depths = array('i', [0]) * len(positions)
+    for gate in levels.order:
+        position = positions[gate]
+        depth = 0
+        for input_ in fan_in[fan_in_offsets[gate]:fan_in_offsets[gate + 1]]:
+            if positions[input_] < position and depths[input_] > depth:
+                depth = depths[input_]
+        depths[gate] = depth + 1
+    return depths
+
+
+def component_at(levels, position):
+    """ the index of the component containing a position in the evaluation order """
+    return bisect.bisect_right(levels.component_starts, position) - 1
+
+
+def partition(fan_in_offsets, fan_in, fan_out_offsets, fan_out, levels, parts, passes=4, imbalance=1.05):
+    """
+    split the gates into a number of balanced parts with few links between them
+    start from contiguous runs of the evaluation order, which keeps logic cones together,
+    then repeatedly move gates to the part most of their links go to as long as that part isn't full
+    returns the part of each gate
+    """
+    size = len(fan_out_offsets) - 1
+    fan_in = memoryview(fan_in)
+    fan_out = memoryview(fan_out)
+    owners = array('i', [0]) * size
+    for position, gate in enumerate(levels.order):
+        owners[gate] = position * parts // size
+    part_sizes = collections.Counter(owners)
+    limit = math.ceil(size / parts * imbalance)
+
+    for i in range(passes):
+        moved = 0
+        for gate in range(size):
+            here = owners[gate]
+            links = collections.Counter(owners[g] for g in fan_in[fan_in_offsets[gate]:fan_in_offsets[gate + 1]])
+            links.update(owners[g] for g in fan_out[fan_out_offsets[gate]:fan_out_offsets[gate + 1]])
+            best = here
+            for part, count in links.items():
+                if count > links[best] and part_sizes[part] < limit:
+                    best = part
+            if best != here:
+                owners[gate] = best
+                part_sizes[here] -= 1
+                part_sizes[best] += 1
+                moved += 1
+        if not moved:
+            break
+    return owners
+
+
+def cut_size(fan_out_offsets, fan_out, owners):
+    """ the number of links that cross between parts """
+    return sum(
+        owners[gate] != owners[output]
+        for gate in range(len(fan_out_offsets) - 1)
+        for output in fan_out[fan_out_offsets[gate]:fan_out_offsets[gate + 1]]
+    )
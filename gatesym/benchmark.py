@@ -0,0 +1,261 @@
+"""
+benchmarks for the engines, building the computer and running programs on it, and editing a network like the game does
+
+    python -m gatesym.benchmark [--quick] [--only NAME] [--json PATH] [--baseline PATH] [--save] [--threshold 0.2]
+
+results are compared to a baseline (by default the one stored next to this file) and any that are worse by more than
+the threshold are flagged and make it exit with status 1, --save replaces the baseline with this run's results
+the numbers are only comparable between runs on the same machine, so regenerate the baseline when that changes
+"""
+
+import argparse
+import collections
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from gatesym import core
+from gatesym.computer import computer
+from gatesym.gates import Switch
+from gatesym.main import basic_add, fib, loop, primes
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 0.2
+
+# better is which way is an improvement, 'lower' or 'higher'
+Result = collections.namedtuple('Result', 'name value unit better')
+
+ENGINES = [None, core.EVENT, core.COUNTING, core.LEVELIZED, core.RANKED, core.SYNCHRONOUS, core.FRONTIER]
+
+
+def _engine_name(engine):
+    return engine or 'unfrozen'
+
+
+def _best(function, repeat):
+    """ the fastest of repeat runs of function, in seconds """
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+@contextlib.contextmanager
+def _quiet():
+    """ building the computer and editing the game's Model print as they go """
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def _toggle_and_drain(network, switches):
+    """ a function flipping the switches and settling, and how many steps that takes """
+    def run():
+        for switch in switches:
+            network.write(switch, not network.read(switch))
+        return network.drain()
+    return run
+
+
+def chain(quick):
+    """ a long chain of nors, a toggle has to ripple down it one gate per step """
+    length = 200 if quick else 5000
+    for engine in ENGINES:
+        if engine == core.SYNCHRONOUS:
+            continue  # it evaluates every gate every step, so a chain is quadratic
+        network = core.Network()
+        switch = network.add_gate(core.SWITCH)
+        previous = switch
+        for i in range(length):
+            previous = network.add_gate(core.NOR, inputs=[previous])
+        if engine:
+            network.freeze(engine)
+        network.drain()
+        run = _toggle_and_drain(network, [switch])
+        run()
+        seconds = _best(run, 3)
+        yield Result(f'chain.{_engine_name(engine)}.drain', seconds, 's', 'lower')
+        yield Result(f'chain.{_engine_name(engine)}.toggles', length / seconds, 'gates/s', 'higher')
+
+
+def fan_in_tree(quick):
+    """ a tree of nors, each with 4 inputs, fed by a layer of switches that all flip at once """
+    depth = 4 if quick else 7
+    for engine in ENGINES:
+        network = core.Network()
+        switches = [network.add_gate(core.SWITCH) for i in range(4 ** depth)]
+        layer = switches
+        while len(layer) > 1:
+            layer = [network.add_gate(core.NOR, inputs=layer[i:i + 4]) for i in range(0, len(layer), 4)]
+        if engine:
+            network.freeze(engine)
+        network.drain()
+        run = _toggle_and_drain(network, switches)
+        run()
+        yield Result(f'fan_in_tree.{_engine_name(engine)}.drain', _best(run, 3), 's', 'lower')
+
+
+def _build_computer(rom_content):
+    with _quiet():
+        network = core.Network()
+        clock = Switch(network)
+        computer(clock, rom_content)
+    return network, clock
+
+
+def build(quick):
+    """ building and freezing the computer, and the memory that takes """
+    start = time.perf_counter()
+    network, clock = _build_computer(primes())
+    yield Result('build.computer', time.perf_counter() - start, 's', 'lower')
+    start = time.perf_counter()
+    network.freeze(core.COUNTING)
+    yield Result('build.freeze', time.perf_counter() - start, 's', 'lower')
+
+    if not quick:
+        # tracing slows everything down, so it gets a build of it's own
+        tracemalloc.start()
+        try:
+            network, clock = _build_computer(primes())
+            yield Result('build.computer.peak_memory', tracemalloc.get_traced_memory()[1], 'B', 'lower')
+            network.freeze(core.COUNTING)
+            yield Result('build.frozen.memory', tracemalloc.get_traced_memory()[0], 'B', 'lower')
+        finally:
+            tracemalloc.stop()
+
+
+def programs(quick):
+    """ clock cycles per second running the example programs on the computer """
+    cycles = 50 if quick else 500
+    for program in [basic_add, loop, fib, primes]:
+        network, clock = _build_computer(program())
+        network.freeze(core.COUNTING)
+        network.drain()
+        start = time.perf_counter()
+        network.run_cycles(clock.index, cycles)
+        seconds = time.perf_counter() - start
+        yield Result(f'program.{program.__name__}', cycles / seconds, 'cycles/s', 'higher')
+
+
+def _headless_model(app):
+    """ the game's Model without a window, blocks aren't drawn but everything else is real """
+    model = app.Model.__new__(app.Model)
+    model.world = {}
+    model.orientation = {}
+    model.line = {}
+    model._shown = {}
+    model.network = core.Network()
+    model._changes = model.network.subscribe()
+    model._pixels = None
+    model.show_block = model.hide_block = lambda position: None
+    return model
+
+
+def edits(quick):
+    """ building and rewiring a line of blocks in the game's Model, as a player placing blocks would """
+    try:
+        import main as app
+    except ImportError as e:
+        print(f"skipping edits, the game can't be imported: {e}", file=sys.stderr)
+        return
+    length = 50 if quick else 500
+
+    def workload():
+        model = _headless_model(app)
+        with _quiet():
+            position = (0, 0, 0)
+            model.add_block(position, app.CLOCK)
+            for i in range(1, length + 1):
+                model.add_block((i, 0, 0), app.GATE if i % 2 == 0 else app.WIRE, app.LEFT)
+            # swapping the wires for gates and back rewires everything downstream of them
+            for i in range(1, length + 1, 2):
+                model.add_block((i, 0, 0), app.GATE, app.LEFT)
+                model.add_block((i, 0, 0), app.WIRE, app.LEFT)
+    yield Result('edits.model', _best(workload, 3), 's', 'lower')
+
+
+BENCHMARKS = [chain, fan_in_tree, build, programs, edits]
+
+
+def run(only=None, quick=False):
+    """ run the benchmarks whose names contain only, or all of them, returns a list of Results """
+    results = []
+    for benchmark in BENCHMARKS:
+        if only is None or only in benchmark.__name__:
+            results.extend(benchmark(quick))
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    the results that are worse than the baseline by more than threshold (a fraction)
+    as (result, baseline value, ratio) where ratio is how many times worse it is
+    """
+    regressions = []
+    for result in results:
+        if result.name not in baseline:
+            continue
+        base = baseline[result.name]['value']
+        if not base or not result.value:
+            continue
+        if result.better == 'lower':
+            ratio = result.value / base
+        else:
+            ratio = base / result.value
+        if ratio > 1 + threshold:
+            regressions.append((result, base, ratio))
+    return regressions
+
+
+def to_json(results):
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': {result.name: result._asdict() for result in results},
+    }
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m gatesym.benchmark', description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--quick', action='store_true', help='smaller sizes and no comparison, to check they work')
+    parser.add_argument('--only', help='only run the benchmarks with this in their name')
+    parser.add_argument('--json', help='write the results here as json')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='compare against these saved results')
+    parser.add_argument('--save', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='the fraction worse to flag')
+    args = parser.parse_args(args)
+
+    results = run(args.only, args.quick)
+    # quick runs use different sizes so they aren't comparable
+    baseline = load_baseline(args.baseline) if os.path.exists(args.baseline) and not args.quick else {}
+    regressions = {result.name: ratio for result, base, ratio in compare(results, baseline, args.threshold)}
+    for result in results:
+        line = f'{result.name:40} {result.value:14.6g} {result.unit:9}'
+        if result.name in baseline:
+            line += f' baseline {baseline[result.name]["value"]:14.6g}'
+        if result.name in regressions:
+            line += f' REGRESSION {regressions[result.name]:.2f}x worse'
+        print(line.rstrip())
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(to_json(results), f, indent=2)
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(to_json(results), f, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
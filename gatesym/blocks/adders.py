@@ -1,9 +1,11 @@
-from gatesym.gates import And, Nor, Not, Or, Tie, block
+from gatesym.gates import And, Nor, Not, Or, Tie, Xor, block
 
 
 @block
 def half_adder(a, b):
     """ add two bits, return a sum and a carry """
+    if a.network.rich_primitives:
+        return Xor(a, b), And(a, b)
     carry = Nor(Not(a), Not(b))
     result = Nor(Nor(a, b), carry)
     return result, carry
@@ -17,7 +19,13 @@ def full_adder(a, b, c):
     return s2, Or(c1, c2)
 
 
-@block
+def _add(aw, bw):
+    """ behavioral model of ripple_adder """
+    total = aw + bw
+    return total % 2 ** aw.width, total >= 2 ** aw.width
+
+
+@block(model=_add)
 def ripple_adder(aw, bw):
     """ chain multiple full_adders to add two words returning a sum word and a carry bit """
     assert len(aw) == len(bw)
@@ -29,7 +37,12 @@ def ripple_adder(aw, bw):
     return rw, c
 
 
-@block
+def _incr(word):
+    """ behavioral model of ripple_incr """
+    return (word + 1) % 2 ** word.width, word + 1 == 2 ** word.width
+
+
+@block(model=_incr)
 def ripple_incr(word):
     """ increment a word by 1 """
     c = Tie(word[0].network, True)
@@ -62,6 +75,8 @@ def ripple_sum(*words):
 @block
 def half_subtractor(a, b):
     """ subtract bit B from bit A, return a difference and a borrow """
+    if a.network.rich_primitives:
+        return Xor(a, b), And(Not(a), b)
     borrow = And(Not(a), b)
     result = Or(And(a, Not(b)), And(Not(a), b))
     return result, borrow
@@ -77,7 +92,12 @@ def full_subtractor(a, b, c):
     return s2, Or(c1, c2)
 
 
-@block
+def _subtract(aw, bw):
+    """ behavioral model of ripple_subtractor """
+    return (aw - bw) % 2 ** aw.width, aw < bw
+
+
+@block(model=_subtract)
 def ripple_subtractor(aw, bw):
     """ chain multiple full_subtractors to subtract word B from word A returning a difference word and a borrow bit """
     assert len(aw) == len(bw)
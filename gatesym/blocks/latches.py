@@ -1,4 +1,5 @@
-from gatesym.gates import Nor, Not, Placeholder, block
+from gatesym import core
+from gatesym.gates import Nor, Not, Placeholder, Primitive, block
 from gatesym.utils import invert
 
 
@@ -25,8 +26,25 @@ def ms_d_flop(data_, clock, clock_):
 
 
 @block
-def register(data, clock, negate_in=False, negate_out=False):
-    """ a bank of ms_d_flops that share a clock line """
+def register(data, clock, negate_in=False, negate_out=False, primitive=None):
+    """
+    a bank of ms_d_flops that share a clock line
+    with primitive it's a bank of the network's dffs instead, which behave the same at one gate a bit
+    primitive defaults to whether the network has rich_primitives
+    """
+    if primitive is None:
+        primitive = clock.network.rich_primitives
+    if primitive:
+        # when both are negated the inversions cancel, other than it starting high
+        if negate_in != negate_out:
+            data = invert(data)
+        res = []
+        for i in data:
+            d = Primitive(core.DFF, clock, i)
+            d.network.write(d.index, negate_out)
+            res.append(d)
+        return res
+
     clock_ = Not(clock)
     if not negate_in:
         data_ = invert(data)
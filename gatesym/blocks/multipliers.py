@@ -3,7 +3,13 @@ from gatesym.gates import And, Or, block
 from gatesym.utils import shuffle_right
 
 
-@block
+def _multiply(a, b):
+    """ behavioral model of ripple_multiplier """
+    total = a * b
+    return total % 2 ** a.width, total >= 2 ** a.width
+
+
+@block(model=_multiply)
 def ripple_multiplier(a, b):
     """
     a ripple multiplier, it's basically long addition in binary
@@ -0,0 +1,121 @@
+"""
+an on disk cache of built networks, so designs that haven't changed don't have to be rebuilt from python objects
+
+entries are netlists (see Network.save_netlist) named by a hash of everything that could change the result:
+the source of the builder and of the whole gatesym package, and the arguments it was called with
+the cache is kept under a total size by evicting the least recently used entries
+"""
+
+import hashlib
+import inspect
+import os
+import tempfile
+
+from gatesym import core
+from gatesym.gates import Gate, Node, Switch, Tie
+
+# bump this to invalidate every entry when the format of an entry changes
+CACHE_VERSION = 1
+DEFAULT_DIR = os.environ.get('GATESYM_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'gatesym'))
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+_SUFFIX = '.gsnl'
+
+_package_hash = None
+
+
+def _hash_package():
+    """ a hash of the source of the gatesym package, standing in for it's version """
+    global _package_hash
+    if _package_hash is None:
+        hasher = hashlib.sha256()
+        root = os.path.dirname(os.path.abspath(__file__))
+        for directory, directories, files in os.walk(root):
+            directories[:] = sorted(d for d in directories if d not in ['tests', '__pycache__'])
+            for name in sorted(files):
+                if name.endswith('.py'):
+                    path = os.path.join(directory, name)
+                    hasher.update(os.path.relpath(path, root).encode())
+                    with open(path, 'rb') as f:
+                        hasher.update(f.read())
+        _package_hash = hasher.hexdigest()
+    return _package_hash
+
+
+def key(builder, *args):
+    """ the cache key for a builder called with some arguments """
+    hasher = hashlib.sha256()
+    hasher.update(f'{CACHE_VERSION}\n{_hash_package()}\n'.encode())
+    hasher.update(f'{builder.__module__}.{builder.__qualname__}\n'.encode())
+    hasher.update(inspect.getsource(builder).encode())
+    hasher.update(repr(args).encode())
+    return hasher.hexdigest()
+
+
+def _flatten(ports, path, names):
+    """ name the gates in a nested structure of ports by their path through it """
+    if isinstance(ports, (list, tuple)):
+        for i, port in enumerate(ports):
+            _flatten(port, f'{path}{i}.', names)
+    else:
+        assert isinstance(ports, Node), ports
+        names[path[:-1]] = ports.index
+
+
+def _unflatten(network, names):
+    """ rebuild the nested ports from their paths, as lists of handles onto a loaded network """
+    root = []
+    for path, index in names.items():
+        container = root
+        parts = [int(part) for part in path.split('.')]
+        for part in parts[:-1]:
+            if len(container) == part:
+                container.append([])
+            container = container[part]
+        type_ = core._TYPES[network._types[index]]
+        handle_class = {core.SWITCH: Switch, core.TIE: Tie}.get(type_, Gate)
+        container.append(handle_class.existing(network, index, type_))
+    return root
+
+
+def _evict(cache_dir, max_size):
+    """ delete the least recently used entries until the cache fits in max_size """
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(_SUFFIX):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_size:
+            break
+        os.remove(os.path.join(cache_dir, name))
+        total -= size
+
+
+def build(builder, *args, cache_dir=DEFAULT_DIR, max_size=DEFAULT_MAX_SIZE, engine=core.EVENT):
+    """
+    build a network with builder(network, *args), or load it from the cache if nothing has changed since last time
+
+    builder must return it's ports, gates in any nesting of lists and tuples, and only depend on it's arguments
+    returns the frozen network and the ports, on a cache hit they come back as lists of handles onto the loaded network
+    """
+    path = os.path.join(cache_dir, key(builder, *args) + _SUFFIX)
+    if os.path.exists(path):
+        os.utime(path)  # mark it recently used
+        network, names = core.Network.load_netlist(path, engine)
+        return network, _unflatten(network, names)
+
+    network = core.Network()
+    ports = builder(network, *args)
+    network.freeze(engine)
+    names = {}
+    _flatten(ports, '', names)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # write it under a temporary name first so nobody can load half an entry
+    handle, temporary = tempfile.mkstemp(dir=cache_dir)
+    os.close(handle)
+    network.save_netlist(temporary, names)
+    os.replace(temporary, path)
+    _evict(cache_dir, max_size)
+    return network, ports
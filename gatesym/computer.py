@@ -1,5 +1,6 @@
 import collections
 
+from gatesym import optimizer
 from gatesym.gates import Placeholder
 from gatesym.modules import bus, cpu_core, jump, literals, math, memory
 from gatesym.utils import PlaceholderWord
@@ -21,7 +22,8 @@ PRINT_BASE = 0x314
 Module = collections.namedtuple('Module', 'name base_address address_size data_lines write_line')
 
 
-def computer(clock, rom_content):
+def computer(clock, rom_content, optimize=False):
+    """ build the whole computer, optimize runs the optimizer over it keeping only what affects the print module """
     network = clock.network
 
     # cpu
@@ -96,12 +98,22 @@ def computer(clock, rom_content):
     for write_line, module in zip(write_lines, modules):
         module.write_line.replace(write_line)
 
+    blocks = [('cpu', data_out[0].block)]
+    blocks += [(module.name, module.data_lines[0].block) for module in modules]
+    blocks += [('bus', data_from_bus[0].block)]
+
     # print out the module sizes
-    print('cpu', data_out[0].block.size)
-    for module in modules:
-        print(module.name, module.data_lines[0].block.size)
-    print('bus', data_from_bus[0].block.size)
-    print('total', network.get_size())
+    if optimize:
+        total = optimizer.count_gates(network)
+        counts = optimizer.optimize(network, [print_write] + list(print_data))
+        for name, block in blocks:
+            print(name, block.size, optimizer.count_gates(network, block.start, block.start + block.size))
+        print('total', total, optimizer.count_gates(network))
+        print(counts)
+    else:
+        for name, block in blocks:
+            print(name, block.size)
+        print('total', network.get_size())
 
     return print_write, print_data
 
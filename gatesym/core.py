@@ -1,8 +1,124 @@
 """ the actual (and entire) simulation implementation """
 
+import bisect
 import collections
+import functools
+import heapq
+import itertools
+import operator
+from array import array
+
+from gatesym import analysis, storage
 
 TIE, SWITCH, NOR = ['tie', 'switch', 'nor']
+# a gate driven by a macro, see Network.add_macro
+MACRO = 'macro'
+# logic gates other than nor, only for networks created with rich_primitives
+AND, OR, XOR, NOT, BUF, NAND = ['and', 'or', 'xor', 'not', 'buf', 'nand']
+RICH_TYPES = [AND, OR, XOR, NOT, BUF, NAND]
+# an edge triggered d flip flop, it's inputs are the clock then the data
+# data is taken in while the clock is high and the output takes the last of it when the clock goes low
+DFF = 'dff'
+
+# frozen networks store gate types as a code, which is the position in this list, removed gates are None
+# new types go on the end so saved netlists keep their meaning
+_TYPES = [None, TIE, SWITCH, NOR, MACRO] + RICH_TYPES + [DFF]
+_NOR_CODE = _TYPES.index(NOR)
+_DFF_CODE = _TYPES.index(DFF)
+
+# the value of each rich gate from how many of it's inputs are high and how many inputs it has
+_RICH_FUNCTIONS = {
+    AND: lambda high, count: high == count,
+    OR: lambda high, count: high > 0,
+    XOR: lambda high, count: high % 2 == 1,
+    NOT: lambda high, count: high == 0,
+    BUF: lambda high, count: high > 0,
+    NAND: lambda high, count: high != count,
+}
+_RICH_CODES = {_TYPES.index(type_): function for type_, function in _RICH_FUNCTIONS.items()}
+# and the same across every lane of a ParallelNetwork, from the input values and the mask of all lanes
+_LANE_FUNCTIONS = {
+    AND: lambda inputs, mask: functools.reduce(operator.and_, inputs, mask),
+    OR: lambda inputs, mask: functools.reduce(operator.or_, inputs, 0),
+    XOR: lambda inputs, mask: functools.reduce(operator.xor, inputs, 0),
+    NOT: lambda inputs, mask: mask ^ functools.reduce(operator.or_, inputs, 0),
+    BUF: lambda inputs, mask: functools.reduce(operator.or_, inputs, 0),
+    NAND: lambda inputs, mask: mask ^ functools.reduce(operator.and_, inputs, mask),
+}
+_LANE_CODES = {_TYPES.index(type_): function for type_, function in _LANE_FUNCTIONS.items()}
+
+
+def _step_dff(values, masters, index, clock, data):
+    """ the new value of a dff, masters holds the data taken in while the clock was high """
+    if values[clock]:
+        masters[index] = values[data]
+        return values[index]
+    return masters.get(index, values[index])
+
+
+def _initial_value(type_):
+    """ the value of a new gate, before it has any inputs """
+    if type_ in _RICH_FUNCTIONS:
+        return _RICH_FUNCTIONS[type_](0, 0)
+    return type_ == NOR
+
+
+# evaluation engines for frozen networks
+# event: re-evaluate queued gates by scanning their inputs
+# counting: keep a count of high inputs per gate so evaluation is O(1) and the work is in the fan out of toggles
+# levelized: settle in a single sweep in topological order, iterating only the feedback loops until they're stable
+# ranked: settle in a single step, always evaluating the queued gates of lowest logic rank first
+# synchronous: evaluate every nor each step in vectorized batches, for when most of the network is active
+# frontier: the counting engine but the queue is evaluated and expanded with builtins rather than a python loop per gate
+EVENT, COUNTING, LEVELIZED, RANKED, SYNCHRONOUS, FRONTIER = [
+    'event', 'counting', 'levelized', 'ranked', 'synchronous', 'frontier',
+]
+
+
+class OscillationError(Exception):
+    """ a network that won't settle, gates is the set of gates still changing """
+
+    def __init__(self, message, gates):
+        super().__init__(f'{message}: {sorted(gates)}')
+        self.gates = gates
+
+
+# a copy of the simulation state, see Network.snapshot
+Snapshot = collections.namedtuple('Snapshot', 'values queue counts masters', defaults=[None])
+
+_STATE_MAGIC = b'GSST'
+_STATE_VERSION = 1
+_NETLIST_MAGIC = b'GSNL'
+_NETLIST_VERSION = 1
+
+
+class _Macro(object):
+    """ a python function standing in for a chunk of logic, see Network.add_macro """
+
+    def __init__(self, inputs, outputs, function):
+        assert inputs
+        self.inputs = inputs
+        self.outputs = outputs
+        self.function = function
+        self.last = None  # the input values it was last evaluated with
+
+    @property
+    def inputs(self):
+        return self._inputs
+
+    @inputs.setter
+    def inputs(self, inputs):
+        self._inputs = inputs
+        self.gather = _gather(inputs)
+
+
+class Profile(object):
+    """ evaluation and toggle counts per gate, and the clock cycles run, see Network.set_profiling """
+
+    def __init__(self, size):
+        self.evaluations = array('q', [0]) * size
+        self.toggles = array('q', [0]) * size
+        self.cycles = 0
 
 
 class _Gate(collections.namedtuple('_Gate', 'type_, inputs, outputs, cookies')):
@@ -14,56 +130,526 @@ class _Gate(collections.namedtuple('_Gate', 'type_, inputs, outputs, cookies')):
 
 class Network(object):
 
-    def __init__(self):
+    def __init__(self, structural_hashing=False, logger=None, rich_primitives=False):
+        """
+        with structural_hashing nors created with the same inputs (see add_gate) are shared
+        edits to the network are logged at debug level to logger if one is given
+        with rich_primitives the gates in RICH_TYPES can be used as well as nors, and gates.And etc will use them
+        """
+        self.structural_hashing = structural_hashing
+        self.rich_primitives = rich_primitives
+        self.logger = logger
+        self._structure = {}  # sorted inputs -> index of the nor with those inputs
+        self._structure_keys = {}  # the reverse of _structure
+        self.behavioral_blocks = set()  # names of blocks to build as macros, see gates.block
+        self.memoized_blocks = {}  # names of blocks to build memoized -> cache size, see gates.block
         self._gates = []
         self._values = []
         self._queue = set()
         self._watches = []
         self._log = []
         self._free_list = []
+        self._frozen = False
+        self._engine = EVENT
+        self._counts = None
+        self._levels = None
+        self._evaluations = 0
+        self._synchronous_plan = None
+        self._frontier_plan = None
+        self._macros = []
+        self._macro_triggers = {}  # gate index -> the macros it's an input of
+        self._dirty_macros = set()  # macros with an input that has changed since they were last evaluated
+        self._deferred = []  # functions to call before the network is next stepped or frozen, see defer
+        self.blocks = []  # the outermost blocks built on this network, see gates.block
+        self.profile = None
+        self.trace = None  # something with sample, next_cycle and renumber methods, see vcd.VCDWriter
+        self._subscribers = {}  # token -> the set of gates changed since it last polled, see subscribe
+        self._next_token = 0
+        self._masters = {}  # dff index -> the data it took in while it's clock was high
+
+    def add_gate(self, type_, cookie=None, inputs=None):
+        """
+        add a gate, linking it to inputs if they're given
+        with structural hashing a nor with the same inputs as an existing one is that one, with cookie added to it
+        """
+        assert not self._frozen
+        assert type_ in [TIE, SWITCH, NOR, MACRO, DFF] or (self.rich_primitives and type_ in RICH_TYPES)
+        if inputs is not None and self.structural_hashing and type_ == NOR:
+            key = tuple(sorted(inputs))
+            if key in self._structure:
+                index = self._structure[key]
+                self._gates[index].cookies.add(cookie)
+                return index
 
-    def add_gate(self, type_, cookie=None):
-        assert type_ in [TIE, SWITCH, NOR]
         gate = _Gate(type_, {cookie})
         if self._free_list:
             index = self._free_list.pop()
             self._gates[index] = gate
+            self._values[index] = _initial_value(type_)
         else:
             index = len(self._gates)
             self._gates.append(gate)
-        self._values.append(type_ == NOR)
+            self._values.append(_initial_value(type_))
+
+        if inputs is not None:
+            self.add_links(inputs, [index] * len(inputs))
+            if self.structural_hashing and type_ == NOR:
+                self._structure[key] = index
+                self._structure_keys[index] = key
         return index
 
+    def add_gates(self, types, cookies=None):
+        """
+        add a gate of each of the types, with the matching cookies if given
+        the new gates always go on the end, not in any free slots, and their indexes are returned as a range
+        """
+        assert not self._frozen
+        assert set(types) <= {TIE, SWITCH, NOR, MACRO, DFF} | (set(RICH_TYPES) if self.rich_primitives else set())
+        if cookies is None:
+            cookies = [None] * len(types)
+        assert len(cookies) == len(types)
+        start = len(self._gates)
+        self._gates.extend(_Gate(type_, {cookie}) for type_, cookie in zip(types, cookies))
+        self._values[start:start + len(types)] = [_initial_value(type_) for type_ in types]
+        if self.logger:
+            self.logger.debug('add gates %s to %s', start, start + len(types) - 1)
+        return range(start, len(self._gates))
+
+    def _forget_structure(self, index):
+        """ a gate's inputs have changed so it's no longer interchangeable with a new gate on it's old inputs """
+        if index in self._structure_keys:
+            del self._structure[self._structure_keys.pop(index)]
+
     def remove_gate(self, index):
+        assert not self._frozen
         assert not self._gates[index].outputs
         assert not self._gates[index].inputs
+        self._forget_structure(index)
+        self._masters.pop(index, None)
         self._gates[index] = None
         self._free_list.append(index)
 
+    def compact(self):
+        """
+        renumber the gates densely, closing up the holes left by removed gates, the order of the gates is kept
+        returns a dict of old index -> new index for the gates that are left
+
+        handles (the cookies passed to add_gate), watches, macros, the trace, subscriptions and the network's blocks
+        are updated
+        anything else holding indexes needs to be remapped with the returned dict
+        """
+        assert not self._frozen
+        live = [index for index, gate in enumerate(self._gates) if gate is not None]
+        mapping = {old: new for new, old in enumerate(live)}
+        if len(live) == len(self._gates):
+            return mapping
+
+        gates = []
+        for index in live:
+            gate = self._gates[index]
+            gates.append(gate._replace(
+                inputs=[mapping[i] for i in gate.inputs],
+                outputs=[mapping[i] for i in gate.outputs],
+            ))
+            for cookie in gate.cookies:
+                if cookie is not None:
+                    cookie.index = mapping[index]
+        self._gates = gates
+        self._values = [self._values[index] for index in live]
+        self._free_list = []
+        self._queue = {mapping[index] for index in self._queue if index in mapping}
+        self._watches = [(name, mapping[index], negate) for name, index, negate in self._watches]
+        self._structure = {tuple(mapping[i] for i in key): mapping[index] for key, index in self._structure.items()}
+        self._structure_keys = {index: key for key, index in self._structure.items()}
+        self._masters = {mapping[index]: value for index, value in self._masters.items() if index in mapping}
+        self._macro_triggers.clear()
+        for macro in self._macros:
+            macro.inputs = [mapping[index] for index in macro.inputs]
+            macro.outputs = [mapping[index] for index in macro.outputs]
+            self._add_macro_triggers(macro)
+        if self.trace is not None:
+            self.trace.renumber(mapping)
+        for token, changed in self._subscribers.items():
+            self._subscribers[token] = {mapping[index] for index in changed if index in mapping}
+
+        def position(index):
+            """ the new index of a gate, or where it would have been for removed ones """
+            return bisect.bisect_left(live, index)
+        for block in self.blocks:
+            block.renumber(position)
+        return mapping
+
+    def get_type(self, gate_index):
+        """ the type of a gate, None for a removed one """
+        if self._frozen:
+            return _TYPES[self._types[gate_index]]
+        gate = self._gates[gate_index]
+        return gate.type_ if gate else None
+
+    def get_inputs(self, gate_index):
+        """ the indexes of the gates linked into a gate """
+        assert not self._frozen
+        gate = self._gates[gate_index]
+        return list(gate.inputs) if gate else []
+
+    def set_gate_type(self, index, type_):
+        """ change the type of a gate, it's links and value are kept """
+        assert not self._frozen
+        gate = self._gates[index]
+        if type_ in {TIE, SWITCH, MACRO}:
+            assert not gate.inputs
+        self._forget_structure(index)
+        self._gates[index] = gate._replace(type_=type_)
+        if type_ in {NOR, DFF} or type_ in _RICH_FUNCTIONS:
+            self._queue.add(index)
+        else:
+            self._queue.discard(index)
+
+    def add_macro(self, inputs, outputs, function):
+        """
+        drive the output gates, which must be MACRO gates, with a python function of the input gates
+        function takes a list of input values and returns a list of output values
+        it's evaluated after any step where one of the inputs toggled, so it looks like a single gate delay
+        returns a handle for remove_macro
+        """
+        if not self._frozen:
+            assert all(self._gates[index].type_ == MACRO for index in outputs)
+        macro = _Macro(list(inputs), list(outputs), function)
+        self._macros.append(macro)
+        self._add_macro_triggers(macro)
+        self._dirty_macros.add(macro)
+        return macro
+
+    def remove_macro(self, macro):
+        self._macros.remove(macro)
+        self._dirty_macros.discard(macro)
+        for index in set(macro.inputs):
+            self._macro_triggers[index].remove(macro)
+            if not self._macro_triggers[index]:
+                del self._macro_triggers[index]
+
+    def defer(self, function):
+        """ call function before the network is next stepped or frozen, for things that need it fully connected """
+        self._deferred.append(function)
+
+    def _run_deferred(self):
+        deferred, self._deferred = self._deferred, []
+        for function in deferred:
+            function()
+
+    def _add_macro_triggers(self, macro):
+        for index in set(macro.inputs):
+            self._macro_triggers.setdefault(index, []).append(macro)
+
+    def _step_macros(self):
+        """ evaluate the macros with an input that has changed, returns whether any outputs changed """
+        dirty = self._dirty_macros
+        if not dirty:
+            return False
+        self._dirty_macros = set()
+        values = self._values
+        changed = False
+        for macro in self._macros:
+            if macro not in dirty:
+                continue
+            inputs = macro.gather(values)
+            if inputs != macro.last:
+                macro.last = inputs
+                for index, value in zip(macro.outputs, macro.function([bool(value) for value in inputs])):
+                    if values[index] != value:
+                        self.write(index, bool(value))
+                        changed = True
+        return changed
+
     def add_link(self, source_index, destination_index):
-        print("add link", source_index, destination_index)
+        if self.logger:
+            self.logger.debug('add link %s %s', source_index, destination_index)
+        assert not self._frozen
+        self._forget_structure(destination_index)
         dest_gate = self._gates[destination_index]
         source_gate = self._gates[source_index]
-        assert dest_gate.type_ not in {TIE, SWITCH}
+        assert dest_gate.type_ not in {TIE, SWITCH, MACRO}
         source_gate.outputs.append(destination_index)
         dest_gate.inputs.append(source_index)
         self._queue.add(destination_index)
 
+    def add_links(self, sources, destinations):
+        """ link each of sources to the matching destination, checking them and queueing the destinations once """
+        assert not self._frozen
+        assert len(sources) == len(destinations)
+        gates = self._gates
+        unique = set(destinations)
+        for index in unique:
+            assert gates[index].type_ not in {TIE, SWITCH, MACRO}
+            if self._structure_keys:
+                self._forget_structure(index)
+        if self.logger:
+            for source, destination in zip(sources, destinations):
+                self.logger.debug('add link %s %s', source, destination)
+        for source, destination in zip(sources, destinations):
+            gates[source].outputs.append(destination)
+            gates[destination].inputs.append(source)
+        self._queue.update(unique)
+
     def remove_link(self, source_index, destination_index):
-        print("remove link", source_index, destination_index)
+        if self.logger:
+            self.logger.debug('remove link %s %s', source_index, destination_index)
+        assert not self._frozen
+        self._forget_structure(destination_index)
         self._gates[source_index].outputs.remove(destination_index)
         self._gates[destination_index].inputs.remove(source_index)
         self._queue.add(destination_index)
 
+    def freeze(self, engine=EVENT):
+        """
+        pack the network into flat arrays, after this it can still be simulated but no longer edited
+
+        fan in and fan out are stored CSR style, the links of gate i are links[offsets[i]:offsets[i + 1]]
+        and the values are a bytearray, this is a fraction of the memory of the gate tuples and faster to step
+        """
+        assert not self._frozen
+        self._run_deferred()
+        types = bytearray()
+        fan_in_offsets = array('i', [0])
+        fan_in = array('i')
+        fan_out_offsets = array('i', [0])
+        fan_out = array('i')
+        for gate in self._gates:
+            if gate:
+                assert gate.type_ != DFF or len(gate.inputs) == 2, 'a dff needs a clock and a data input'
+                types.append(_TYPES.index(gate.type_))
+                fan_in.extend(gate.inputs)
+                fan_out.extend(gate.outputs)
+            else:
+                types.append(_TYPES.index(None))
+            fan_in_offsets.append(len(fan_in))
+            fan_out_offsets.append(len(fan_out))
+
+        self._types = types
+        self._fan_in_offsets = fan_in_offsets
+        self._fan_in = fan_in
+        self._fan_out_offsets = fan_out_offsets
+        self._fan_out = fan_out
+        self._values = bytearray(self._values[:len(types)])
+        self._gates = None
+        self._free_list = None
+        self._frozen = True
+        self.set_engine(engine)
+
+    def set_engine(self, engine):
+        """ switch evaluation engine, this can be done at any point, the values and queue carry over """
+        assert self._frozen or engine == EVENT
+        assert engine in [EVENT, COUNTING, LEVELIZED, RANKED, SYNCHRONOUS, FRONTIER]
+        if engine in [SYNCHRONOUS, FRONTIER]:
+            assert not self.has_rich_gates(), f'the {engine} engine only handles nors'
+        self._engine = engine
+        if engine in [COUNTING, FRONTIER]:
+            self._counts = self._count_high_inputs()
+        else:
+            self._counts = None
+        if engine in [LEVELIZED, RANKED]:
+            self.get_levels()
+        if engine == SYNCHRONOUS and self._synchronous_plan is None:
+            self._synchronous_plan = _plan_synchronous(
+                self._types, self._fan_in_offsets, self._fan_in, self.get_levels(),
+            )
+        if engine == FRONTIER and self._frontier_plan is None:
+            self._frontier_plan = _plan_frontier(self._types, self._fan_out_offsets, self._fan_out)
+
+    def has_rich_gates(self):
+        """ whether there are any gates of the RICH_TYPES or dffs """
+        if self._frozen:
+            return any(code in _RICH_CODES or code == _DFF_CODE for code in set(self._types))
+        return any(gate and (gate.type_ in _RICH_FUNCTIONS or gate.type_ == DFF) for gate in self._gates)
+
+    def get_levels(self):
+        """ the evaluation order, loops and logic depth of a frozen network, see analysis.levelize """
+        assert self._frozen
+        if self._levels is None:
+            self._levels = analysis.levelize(self._fan_in_offsets, self._fan_in, self._fan_out_offsets, self._fan_out)
+        return self._levels
+
+    def _count_high_inputs(self):
+        values = self._values
+        offsets = self._fan_in_offsets
+        fan_in = memoryview(self._fan_in)
+        counts = array('i')
+        for index in range(len(self._types)):
+            counts.append(sum(map(values.__getitem__, fan_in[offsets[index]:offsets[index + 1]])))
+        return counts
+
+    def _outputs(self, gate_index):
+        if self._frozen:
+            offsets = self._fan_out_offsets
+            return self._fan_out[offsets[gate_index]:offsets[gate_index + 1]]
+        else:
+            return self._gates[gate_index].outputs
+
     def read(self, gate_index):
-        return self._values[gate_index]
+        return bool(self._values[gate_index])
 
     def write(self, gate_index, value):
         if self._values[gate_index] != value:
             self._values[gate_index] = value
-            self._queue.update(self._gates[gate_index].outputs)
+            if self._subscribers:
+                for changed in self._subscribers.values():
+                    changed.add(gate_index)
+            if gate_index in self._macro_triggers:
+                self._dirty_macros.update(self._macro_triggers[gate_index])
+            outputs = self._outputs(gate_index)
+            self._queue.update(outputs)
+            if self._counts is not None:
+                delta = 1 if value else -1
+                for output in outputs:
+                    self._counts[output] += delta
 
     def step(self):
+        return self._stepper()()
+
+    def _stepper(self):
+        """
+        the step method for the current engine, with macros evaluated after it if there are any
+        and the trace sampled after that if there is one
+        """
+        if self._deferred:
+            self._run_deferred()
+        step = self._engine_stepper()
+        if self.profile is not None:
+            step = self._profiled(step)
+        if self._subscribers:
+            step = self._tracked(step)
+        if self._macros:
+            step = self._with_macros(step)
+        if self.trace is not None:
+            step = self._traced(step)
+        return step
+
+    def _with_macros(self, step):
+        """
+        evaluate the macros with an input that toggled after each step
+        on the queue driven engines only the queued gates can toggle, the others check every macro after a step
+        """
+        triggers = self._macro_triggers
+        if not self._frozen or self._engine in [EVENT, COUNTING, FRONTIER]:
+            def step_with_macros():
+                for index in triggers.keys() & self._queue:
+                    self._dirty_macros.update(triggers[index])
+                busy = step()
+                return self._step_macros() or busy
+        else:
+            def step_with_macros():
+                if self._queue:
+                    self._dirty_macros.update(self._macros)
+                busy = step()
+                return self._step_macros() or busy
+        return step_with_macros
+
+    def _traced(self, step):
+        sample = self.trace.sample
+
+        def step_traced():
+            busy = step()
+            sample()
+            return busy
+        return step_traced
+
+    def subscribe(self):
+        """
+        start tracking which gates change, returns a token for changes_since
+        this only costs anything while there are subscribers, unsubscribe when done
+        """
+        token = self._next_token
+        self._next_token += 1
+        self._subscribers[token] = set()
+        return token
+
+    def unsubscribe(self, token):
+        del self._subscribers[token]
+
+    def changes_since(self, token):
+        """
+        the gates that changed since the subscriber last asked, as sorted (index, value) pairs with their current values
+        a gate that changed and changed back is included
+        gates added to or removed from an editable network aren't changes, subscribers have to look out for those
+        """
+        changed = self._subscribers[token]
+        self._subscribers[token] = set()
+        values = self._values
+        return [(index, bool(values[index])) for index in sorted(changed)]
+
+    def _tracked(self, step):
+        """ wrap a step method to record the gates it changes for the subscribers """
+        values = self._values
+        subscribers = self._subscribers.values()
+        if not self._frozen or self._engine in [EVENT, COUNTING, FRONTIER]:
+            # only queued gates can change, and they're the only ones we need to look at
+            def step_tracked():
+                queue = list(self._queue)
+                old = bytes(map(values.__getitem__, queue))
+                busy = step()
+                changed = [index for index, value in zip(queue, old) if values[index] != value]
+                if changed:
+                    for subscriber in subscribers:
+                        subscriber.update(changed)
+                return busy
+        else:
+            # these engines can change gates beyond the queue in a single step, so compare everything
+            def step_tracked():
+                old = bytes(values)
+                busy = step()
+                if old != values:
+                    changed = [index for index, (a, b) in enumerate(zip(old, values)) if a != b]
+                    for subscriber in subscribers:
+                        subscriber.update(changed)
+                return busy
+        return step_tracked
+
+    def set_profiling(self, profiling=True):
+        """
+        start counting evaluations and toggles per gate in a new self.profile, or stop
+        this only costs anything while it's on, see the profiler module for making sense of the counts
+        """
+        if profiling:
+            assert self._frozen
+            assert self._engine in [EVENT, COUNTING, FRONTIER], 'only the queue driven engines can be profiled'
+            self.profile = Profile(len(self._types))
+        else:
+            self.profile = None
+
+    def _profiled(self, step):
+        """ wrap a step method to count what happens to each queued gate """
+        evaluations = self.profile.evaluations
+        toggles = self.profile.toggles
+        values = self._values
+
+        def step_profiled():
+            queue = list(self._queue)
+            old = bytes(map(values.__getitem__, queue))
+            busy = step()
+            for index, value in zip(queue, old):
+                evaluations[index] += 1
+                if values[index] != value:
+                    toggles[index] += 1
+            return busy
+        return step_profiled
+
+    def _engine_stepper(self):
+        if self._frozen:
+            if self._engine == COUNTING:
+                return self._step_counting
+            if self._engine == LEVELIZED:
+                return self._step_levelized
+            if self._engine == RANKED:
+                return self._step_ranked
+            if self._engine == SYNCHRONOUS:
+                return self._step_synchronous
+            if self._engine == FRONTIER:
+                return self._step_frontier
+            return self._step_frozen
+        return self._step_unfrozen
+
+    def _step_unfrozen(self):
+        self._evaluations += len(self._queue)
         queue = set()
         values = self._values  # localize references for speed
         gates = self._gates  # localize references for speed
@@ -74,6 +660,10 @@ class Network(object):
             if gate:
                 if gate.type_ == NOR:
                     res = not(any(values[i] for i in gate.inputs))
+                elif gate.type_ in _RICH_FUNCTIONS:
+                    res = _RICH_FUNCTIONS[gate.type_](sum(values[i] for i in gate.inputs), len(gate.inputs))
+                elif gate.type_ == DFF:
+                    res = _step_dff(values, self._masters, index, *gate.inputs)
                 else:
                     assert False, gate.type_
 
@@ -84,17 +674,465 @@ class Network(object):
         self._queue = queue
         return bool(queue)
 
-    def drain(self):
+    def _step_frozen(self):
+        self._evaluations += len(self._queue)
+        queue = set()
+        values = self._values  # localize references for speed
+        types = self._types
+        fan_in_offsets = self._fan_in_offsets
+        fan_in = memoryview(self._fan_in)  # slicing a memoryview doesn't copy
+        fan_out_offsets = self._fan_out_offsets
+        fan_out = memoryview(self._fan_out)
+        get_value = values.__getitem__
+        rich = _RICH_CODES
+        masters = self._masters
+
+        for index in self._queue:
+            code = types[index]
+            if code == _NOR_CODE:
+                res = not any(map(get_value, fan_in[fan_in_offsets[index]:fan_in_offsets[index + 1]]))
+            elif code in rich:
+                inputs = fan_in[fan_in_offsets[index]:fan_in_offsets[index + 1]]
+                res = rich[code](sum(map(get_value, inputs)), len(inputs))
+            elif code == _DFF_CODE:
+                res = _step_dff(values, masters, index, *fan_in[fan_in_offsets[index]:fan_in_offsets[index + 1]])
+            else:
+                continue
+
+            if values[index] != res:
+                values[index] = res
+                queue.update(fan_out[fan_out_offsets[index]:fan_out_offsets[index + 1]])
+
+        self._queue = queue
+        return bool(queue)
+
+    def _step_counting(self):
+        self._evaluations += len(self._queue)
+        queue = set()
+        values = self._values  # localize references for speed
+        types = self._types
+        counts = self._counts
+        fan_in_offsets = self._fan_in_offsets
+        fan_in = memoryview(self._fan_in)
+        fan_out_offsets = self._fan_out_offsets
+        fan_out = memoryview(self._fan_out)
+        rich = _RICH_CODES
+        masters = self._masters
+
+        for index in self._queue:
+            code = types[index]
+            if code == _NOR_CODE:
+                res = not counts[index]
+            elif code in rich:
+                res = rich[code](counts[index], fan_in_offsets[index + 1] - fan_in_offsets[index])
+            elif code == _DFF_CODE:
+                # inlined as this is the engine the computer runs on, see _step_dff
+                start = fan_in_offsets[index]
+                if values[fan_in[start]]:
+                    masters[index] = values[fan_in[start + 1]]
+                    continue
+                res = masters.get(index, values[index])
+            else:
+                continue
+
+            if values[index] != res:
+                values[index] = res
+                outputs = fan_out[fan_out_offsets[index]:fan_out_offsets[index + 1]]
+                delta = 1 if res else -1
+                for output in outputs:
+                    counts[output] += delta
+                queue.update(outputs)
+
+        self._queue = queue
+        return bool(queue)
+
+    def _step_levelized(self):
+        """
+        evaluate everything from the earliest queued gate onwards in a single pass
+        loops are repeated from the earliest gate a toggle fed back to until they stop changing
+        if one still hasn't settled after as many passes as it has gates it's left queued for the next step
+        """
+        if not self._queue:
+            return False
+
+        values = self._values  # localize references for speed
+        types = self._types
+        fan_in_offsets = self._fan_in_offsets
+        fan_in = memoryview(self._fan_in)
+        get_value = values.__getitem__
+        levels = self._levels
+        order = levels.order
+        feedback = levels.feedback
+        rich = _RICH_CODES
+        masters = self._masters
+
+        start = min(map(levels.positions.__getitem__, self._queue))
+        first = analysis.component_at(levels, start)
+        for component in range(first, len(levels.component_starts)):
+            end = levels.component_ends[component]
+            if component != first:
+                start = levels.component_starts[component]
+
+            passes = end - start + 1
+            while start is not None:
+                if not passes:
+                    self._queue = set(order[start:end])
+                    return True
+                passes -= 1
+
+                repeat = None
+                self._evaluations += end - start
+                for index in order[start:end]:
+                    code = types[index]
+                    if code == _NOR_CODE:
+                        res = not any(map(get_value, fan_in[fan_in_offsets[index]:fan_in_offsets[index + 1]]))
+                    elif code in rich:
+                        inputs = fan_in[fan_in_offsets[index]:fan_in_offsets[index + 1]]
+                        res = rich[code](sum(map(get_value, inputs)), len(inputs))
+                    elif code == _DFF_CODE:
+                        inputs = fan_in[fan_in_offsets[index]:fan_in_offsets[index + 1]]
+                        res = _step_dff(values, masters, index, *inputs)
+                    else:
+                        continue
+
+                    if values[index] != res:
+                        values[index] = res
+                        back = feedback[index]
+                        if back != -1 and (repeat is None or back < repeat):
+                            repeat = back
+                start = repeat
+
+        self._queue = set()
+        return False
+
+    def _step_ranked(self):
+        """
+        evaluate the queue in rank order, the rank being the gate's position in the levelized order
+        so in loop free logic each gate is evaluated at most once, after all the gates that feed it
+        toggles that feed back round a loop are held for another pass, like the levelized engine
+        but only gates with a changed input are evaluated
+        if that hasn't settled after as many passes as there are gates it's left queued for the next step
+        """
+        if not self._queue:
+            return False
+
+        values = self._values  # localize references for speed
+        types = self._types
+        fan_in_offsets = self._fan_in_offsets
+        fan_in = memoryview(self._fan_in)
+        fan_out_offsets = self._fan_out_offsets
+        fan_out = memoryview(self._fan_out)
+        get_value = values.__getitem__
+        order = self._levels.order
+        positions = self._levels.positions
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+        queued = bytearray(len(types))
+        evaluations = 0
+        rich = _RICH_CODES
+        masters = self._masters
+        passes = len(types) + 1
+
+        again = self._queue
+        while again:
+            if not passes:
+                self._queue = again
+                self._evaluations += evaluations
+                return True
+            passes -= 1
+
+            pending = []
+            for index in again:
+                queued[index] = True
+                pending.append(positions[index])
+            heapq.heapify(pending)
+            again = set()
+
+            while pending:
+                position = heappop(pending)
+                index = order[position]
+                queued[index] = False
+                code = types[index]
+                if code == _NOR_CODE:
+                    res = not any(map(get_value, fan_in[fan_in_offsets[index]:fan_in_offsets[index + 1]]))
+                elif code in rich:
+                    inputs = fan_in[fan_in_offsets[index]:fan_in_offsets[index + 1]]
+                    res = rich[code](sum(map(get_value, inputs)), len(inputs))
+                elif code == _DFF_CODE:
+                    inputs = fan_in[fan_in_offsets[index]:fan_in_offsets[index + 1]]
+                    res = _step_dff(values, masters, index, *inputs)
+                else:
+                    continue
+                evaluations += 1
+
+                if values[index] != res:
+                    values[index] = res
+                    for output in fan_out[fan_out_offsets[index]:fan_out_offsets[index + 1]]:
+                        output_position = positions[output]
+                        if output_position <= position:
+                            again.add(output)
+                        elif not queued[output]:
+                            queued[output] = True
+                            heappush(pending, output_position)
+
+        self._queue = set()
+        self._evaluations += evaluations
+        return False
+
+    def _step_synchronous(self):
+        """
+        evaluate every nor, a batch at a time in order of logic depth
+
+        the gates are copied into a working layout where each batch is contiguous and each batch's inputs are gathered
+        a column at a time, a column of input values becomes one big int so the or across a batch is a few int
+        operations and the results go back as one slice, gates in a batch don't feed each other so this behaves like
+        an in place sweep of every gate, a pure simultaneous update would leave cross coupled latches oscillating
+        """
+        if not self._queue:
+            return False
+
+        batches, to_layout, from_layout = self._synchronous_plan
+        old = bytes(self._values)
+        work = bytearray(to_layout(old))
+        start = 0
+        for size, columns, ones in batches:
+            any_high = 0
+            for column in columns:
+                any_high |= int.from_bytes(column(work), 'little')
+            work[start:start + size] = (any_high ^ ones).to_bytes(size, 'little')
+            start += size
+        self._evaluations += start
+        new = from_layout(work)
+        self._values[:] = new
+
+        # the next step needs to look at the outputs of everything that toggled
+        queue = set()
+        fan_out_offsets = self._fan_out_offsets
+        fan_out = memoryview(self._fan_out)
+        toggled = (int.from_bytes(old, 'little') ^ int.from_bytes(new, 'little')).to_bytes(len(new), 'little')
+        index = toggled.find(1)
+        while index != -1:
+            queue.update(fan_out[fan_out_offsets[index]:fan_out_offsets[index + 1]])
+            index = toggled.find(1, index + 1)
+
+        self._queue = queue
+        return bool(queue)
+
+    def _step_frontier(self):
+        """
+        evaluate the queue like the counting engine but using builtins, python code only runs per toggle not per gate
+
+        the nors in the queue are taken in the order the other engines evaluate them and evaluated together,
+        the toggles are then applied in order up to the first gate with an input that toggled earlier in the step
+        and the rest are evaluated again from there, so the results are the same as evaluating them one at a time
+        """
+        fan_outs, nors = self._frontier_plan
+        values = self._values  # localize references for speed
+        counts = self._counts
+        order = tuple(filter(nors.__getitem__, self._queue))
+        positions = dict(zip(order, range(len(order))))
+        self._evaluations += len(order)
+        queue = set()
+
+        start = 0
+        while start < len(order):
+            frontier = order[start:]
+            new = bytes(map(operator.not_, map(counts.__getitem__, frontier)))
+            old = bytes(map(values.__getitem__, frontier))
+            stop = len(order)
+            toggled = []
+            for index in itertools.compress(frontier, map(operator.ne, new, old)):
+                position = positions[index]
+                if position >= stop:
+                    break
+                res = not values[index]
+                values[index] = res
+                delta = 1 if res else -1
+                for output in fan_outs[index]:
+                    counts[output] += delta
+                    if position < positions.get(output, -1) < stop:
+                        stop = positions[output]
+                toggled.append(index)
+            queue.update(itertools.chain.from_iterable(map(fan_outs.__getitem__, toggled)))
+            start = stop
+
+        self._queue = queue
+        return bool(queue)
+
+    def drain(self, max_steps=None, window=64):
+        """
+        step until the network settles, returns the number of steps taken
+
+        raises OscillationError if it's still going after max_steps, or if after window steps
+        the queue goes round the same cycle twice in a row, which can only happen in a loop that will never settle
+        """
+        return self._settle(self._stepper(), max_steps, window)
+
+    def _settle(self, step, max_steps, window):
+        """ drain using step, which is the network's _stepper, run_until takes it once for all it's edges """
         count = 0
-        if self._queue:
+        if self._queue or self._dirty_macros:
             count += 1
-            while self.step():
+            history = collections.deque(maxlen=window)
+            last_seen = {}  # queue -> the last step it was seen, for the queues in history
+            while step():
                 count += 1
+                if max_steps is not None and count > max_steps:
+                    raise OscillationError(f'still changing after {max_steps} steps', set(self._queue))
+                if count > window:
+                    # only long settles pay for the checking
+                    queue = frozenset(self._queue)
+                    if len(history) == window and last_seen[history[0]] == count - window:
+                        del last_seen[history[0]]  # about to drop out of the history
+                    history.append(queue)
+                    period = count - last_seen.get(queue, 0)
+                    last_seen[queue] = count
+                    if 2 * period <= len(history):
+                        recent = list(history)
+                        if recent[-period:] == recent[-2 * period:-period]:
+                            raise OscillationError(
+                                f'oscillating with period {period}', set().union(*recent[-period:]),
+                            )
         return count
 
+    def run_cycles(self, clock_index, cycles, max_steps=None, window=64):
+        """
+        clock a gate high then low for a number of cycles, settling the network after each edge
+        returns the number of steps each cycle took to settle
+        max_steps and window apply to each edge, see drain
+        """
+        return self.run_until(clock_index, None, None, cycles, max_steps, window)[1]
+
+    def run_until(self, clock_index, gate_index, value, max_cycles, max_steps=None, window=64):
+        """
+        clock a gate like run_cycles until a gate reads value while the clock is high
+        returns the number of cycles run, or None if it never happened, and the steps each cycle took to settle
+        """
+        step = self._stepper()  # localize references for speed
+        settle = self._settle
+        write = self.write
+        values = self._values
+        settle_steps = []
+        for cycle in range(1, max_cycles + 1):
+            if self.trace is not None:
+                self.trace.next_cycle()
+            write(clock_index, True)
+            count = settle(step, max_steps, window)
+            found = gate_index is not None and bool(values[gate_index]) == value
+            write(clock_index, False)
+            count += settle(step, max_steps, window)
+            settle_steps.append(count)
+            if self.profile is not None:
+                self.profile.cycles += 1
+            if found:
+                return cycle, settle_steps
+        return None, settle_steps
+
+    def snapshot(self):
+        """ copy the current state (gate values, dff contents and pending work) so it can be restored later """
+        counts = None if self._counts is None else array('i', self._counts)
+        masters = array('i', itertools.chain.from_iterable(sorted(self._masters.items())))
+        return Snapshot(bytes(self._values), array('i', sorted(self._queue)), counts, masters)
+
+    def restore(self, snapshot):
+        """ go back to a snapshot taken from this network, or one with identical gates """
+        assert len(snapshot.values) == len(self._values)
+        if self._frozen:
+            self._values[:] = snapshot.values
+        else:
+            self._values[:] = map(bool, snapshot.values)
+        self._queue = set(snapshot.queue.tolist())
+        # masters is the dff indexes and their values interleaved
+        masters = [] if snapshot.masters is None else snapshot.masters.tolist()
+        self._masters = dict(zip(masters[::2], masters[1::2]))
+        # the macro inputs may have changed
+        self._dirty_macros.update(self._macros)
+        if self._counts is not None:
+            if snapshot.counts is None:
+                self._counts = self._count_high_inputs()
+            else:
+                self._counts = array('i')
+                self._counts.frombytes(memoryview(snapshot.counts).cast('B'))
+
+    def save_state(self, path):
+        """ write the current state to a file, see storage for the format """
+        snapshot = self.snapshot()
+        sections = [('values', 'B', snapshot.values), ('queue', 'i', snapshot.queue)]
+        if snapshot.counts is not None:
+            sections.append(('counts', 'i', snapshot.counts))
+        if snapshot.masters:
+            sections.append(('masters', 'i', snapshot.masters))
+        storage.write(path, _STATE_MAGIC, _STATE_VERSION, sections)
+
+    def load_state(self, path):
+        """ restore a state written by save_state, the file is memory mapped and copied straight into place """
+        sections = storage.read(path, _STATE_MAGIC, _STATE_VERSION)
+        self.restore(Snapshot(sections['values'], sections['queue'], sections.get('counts'), sections.get('masters')))
+
+    def save_netlist(self, path, names=None):
+        """
+        write a frozen network to a file load_netlist can map straight back in, see storage for the format
+        names is an optional dict of name -> gate index to store alongside, for finding the ports again
+        """
+        assert self._frozen
+        assert not self._macros, "macros are python functions, they can't be saved"
+        names = names or {}
+        assert not any('\n' in name for name, _, _ in self._watches) and not any('\n' in name for name in names)
+        storage.write(path, _NETLIST_MAGIC, _NETLIST_VERSION, [
+            ('types', 'B', self._types),
+            ('fan_in_offsets', 'i', self._fan_in_offsets),
+            ('fan_in', 'i', self._fan_in),
+            ('fan_out_offsets', 'i', self._fan_out_offsets),
+            ('fan_out', 'i', self._fan_out),
+            ('values', 'B', self._values),
+            ('queue', 'i', array('i', sorted(self._queue))),
+            ('masters', 'i', self.snapshot().masters),
+            ('names', 'B', '\n'.join(names).encode()),
+            ('name_gates', 'i', array('i', names.values())),
+            ('watch_names', 'B', '\n'.join(name for name, _, _ in self._watches).encode()),
+            ('watch_gates', 'i', array('i', [index for _, index, _ in self._watches])),
+            ('watch_negate', 'B', bytes(negate for _, _, negate in self._watches)),
+        ])
+
+    @classmethod
+    def load_netlist(cls, path, engine=EVENT):
+        """
+        load a network written by save_netlist, returns the network and the dict of names saved with it
+        the links are used in place from a read only memory map, only the values are copied
+        """
+        sections = storage.read(path, _NETLIST_MAGIC, _NETLIST_VERSION)
+        network = cls()
+        network._types = sections['types']
+        network._fan_in_offsets = sections['fan_in_offsets']
+        network._fan_in = sections['fan_in']
+        network._fan_out_offsets = sections['fan_out_offsets']
+        network._fan_out = sections['fan_out']
+        network._values = bytearray(sections['values'])
+        network._queue = set(sections['queue'].tolist())
+        masters = sections['masters'].tolist() if 'masters' in sections else []
+        network._masters = dict(zip(masters[::2], masters[1::2]))
+        network._gates = None
+        network._free_list = None
+        network._frozen = True
+
+        watch_names = bytes(sections['watch_names']).decode()
+        watch_names = watch_names.split('\n') if watch_names else []
+        for name, index, negate in zip(watch_names, sections['watch_gates'], sections['watch_negate']):
+            network._watches.append((name, index, bool(negate)))
+        names = bytes(sections['names']).decode()
+        names = dict(zip(names.split('\n') if names else [], sections['name_gates']))
+
+        network.set_engine(engine)
+        return network, names
+
     def dump(self):
-        for i, (v, g) in enumerate(zip(self._values, self._gates)):
-            print(i, v, g)
+        if self._frozen:
+            for i, (v, t) in enumerate(zip(self._values, self._types)):
+                inputs = list(self._fan_in[self._fan_in_offsets[i]:self._fan_in_offsets[i + 1]])
+                print(i, bool(v), _TYPES[t], inputs, list(self._outputs(i)))
+        else:
+            for i, (v, g) in enumerate(zip(self._values, self._gates)):
+                print(i, v, g)
 
     def record_log(self):
         new_log = []
@@ -108,6 +1146,7 @@ class Network(object):
 
     def watch(self, gate_index, name, negate):
         assert not self._log
+        assert self.trace is None, 'watches have to be set before tracing starts'
         self._watches.append((name, gate_index, negate))
 
     def print_log(self):
@@ -122,26 +1161,185 @@ class Network(object):
     def get_stats(self):
         gates_by_type = collections.defaultdict(int)
         gates_by_type_and_inputs = collections.defaultdict(int)
-        for gate in self._gates:
-            if gate:
-                gates_by_type[gate.type_] += 1
-                gates_by_type_and_inputs[gate.type_, len(gate.inputs)] += 1
+        for type_, input_count in self._iter_types_and_input_counts():
+            gates_by_type[type_] += 1
+            gates_by_type_and_inputs[type_, input_count] += 1
 
         return {
             'size': self.get_size(),
             'gates_by_type': gates_by_type,
             'gates_by_type_and_inputs': gates_by_type_and_inputs,
+            'engine': self._engine,
+            'evaluations': self._evaluations,
         }
 
+    def _iter_types_and_input_counts(self):
+        """ type and number of inputs of every live gate """
+        if self._frozen:
+            offsets = self._fan_in_offsets
+            for index, code in enumerate(self._types):
+                if code:
+                    yield _TYPES[code], offsets[index + 1] - offsets[index]
+        else:
+            for gate in self._gates:
+                if gate:
+                    yield gate.type_, len(gate.inputs)
+
     def get_size(self):
         """ total count of all gates """
+        if self._frozen:
+            return len(self._types)
         return len(self._gates)
 
     def dump_values(self, prefix, nor_low, nor_high, other_low, other_high):
         res = prefix
-        for gate, value in zip(self._gates, self._values):
-            if gate and gate.type_ == NOR:
+        # rich gates and dffs are drawn like nors
+        if self._frozen:
+            is_nor = (code in {_NOR_CODE, _DFF_CODE} or code in _RICH_CODES for code in self._types)
+        else:
+            is_nor = (gate and (gate.type_ in {NOR, DFF} or gate.type_ in _RICH_FUNCTIONS) for gate in self._gates)
+        for nor, value in zip(is_nor, self._values):
+            if nor:
                 res.extend(nor_high if value else nor_low)
             else:
                 res.extend(other_high if value else other_low)
         return res
+
+
+def _plan_synchronous(types, fan_in_offsets, fan_in, levels):
+    """
+    lay the nors out in batches for the synchronous engine
+
+    a nor's batch is it's logic depth, ignoring links that close loops, and it's number of inputs
+    so no gate in a batch feeds another, batches are ordered by depth and the other gates go at the end
+    returns the batches as (size, columns, ones) where column i gathers the i'th input of each gate from the layout
+    and ones is an int with a 1 in every byte, then functions to gather gate values into the layout and back out
+    """
+    depths = analysis.loop_free_depths(fan_in_offsets, fan_in, levels)
+    by_depth_and_input_count = collections.defaultdict(list)
+    others = array('i')
+    for index in levels.order:
+        if types[index] == _NOR_CODE:
+            input_count = fan_in_offsets[index + 1] - fan_in_offsets[index]
+            by_depth_and_input_count[depths[index], input_count].append(index)
+        else:
+            others.append(index)
+
+    layout = array('i')
+    for key in sorted(by_depth_and_input_count):
+        layout.extend(by_depth_and_input_count[key])
+    layout.extend(others)
+    layout_positions = array('i', [0]) * len(types)
+    for position, index in enumerate(layout):
+        layout_positions[index] = position
+
+    batches = []
+    for (depth, input_count), gates in sorted(by_depth_and_input_count.items()):
+        columns = [
+            _gather([layout_positions[fan_in[fan_in_offsets[gate] + i]] for gate in gates])
+            for i in range(input_count)
+        ]
+        batches.append((len(gates), columns, int.from_bytes(b'\x01' * len(gates), 'little')))
+    return batches, _gather(layout), _gather(layout_positions)
+
+
+def _gather(indexes):
+    """ a function that picks the given indexes out of a sequence of bytes, as bytes """
+    if len(indexes) == 1:
+        index = indexes[0]
+        return lambda values: bytes((values[index],))
+    getter = operator.itemgetter(*indexes)
+    return lambda values: bytes(getter(values))
+
+
+def _plan_frontier(types, fan_out_offsets, fan_out):
+    """
+    per gate lookups for the frontier engine
+    returns a tuple of outputs per gate and a mask of the nors
+    """
+    fan_outs = [tuple(fan_out[fan_out_offsets[i]:fan_out_offsets[i + 1]]) for i in range(len(types))]
+    nors = bytearray(code == _NOR_CODE for code in types)
+    return fan_outs, nors
+
+
+class ParallelNetwork(object):
+    """
+    simulate many independent copies of a frozen network at once
+
+    each gate's value is a python int with one bit per copy (lane), so a nor across every lane is mask ^ (a | b | ...)
+    and the cost of a step hardly depends on the number of lanes, gate indexes are shared with the source network
+    """
+
+    def __init__(self, network, lanes=64):
+        assert network._frozen
+        assert not network._macros
+        self.lanes = lanes
+        self._mask = (1 << lanes) - 1
+        self._types = network._types
+        self._fan_in_offsets = network._fan_in_offsets
+        self._fan_in = network._fan_in
+        self._fan_out_offsets = network._fan_out_offsets
+        self._fan_out = network._fan_out
+        # every lane starts from the current state of the source network
+        self._values = [self._mask if value else 0 for value in network._values]
+        self._masters = {index: self._mask if value else 0 for index, value in network._masters.items()}
+        self._queue = set(network._queue)
+
+    def read(self, gate_index):
+        """ the value of a gate in every lane as an int, lane i is bit i """
+        return self._values[gate_index]
+
+    def write(self, gate_index, value):
+        """ write an int of lane values to a gate """
+        value &= self._mask
+        if self._values[gate_index] != value:
+            self._values[gate_index] = value
+            offsets = self._fan_out_offsets
+            self._queue.update(self._fan_out[offsets[gate_index]:offsets[gate_index + 1]])
+
+    def step(self):
+        queue = set()
+        values = self._values  # localize references for speed
+        types = self._types
+        mask = self._mask
+        fan_in_offsets = self._fan_in_offsets
+        fan_in = memoryview(self._fan_in)
+        fan_out_offsets = self._fan_out_offsets
+        fan_out = memoryview(self._fan_out)
+
+        rich = _LANE_CODES
+        masters = self._masters
+
+        for index in self._queue:
+            code = types[index]
+            if code == _NOR_CODE:
+                any_high = 0
+                for input_ in fan_in[fan_in_offsets[index]:fan_in_offsets[index + 1]]:
+                    any_high |= values[input_]
+                res = mask ^ any_high
+            elif code in rich:
+                res = rich[code](map(values.__getitem__, fan_in[fan_in_offsets[index]:fan_in_offsets[index + 1]]), mask)
+            elif code == _DFF_CODE:
+                # lanes with the clock high take in data and hold the output, the others pass out what they took in
+                clock, data = fan_in[fan_in_offsets[index]:fan_in_offsets[index + 1]]
+                clock = values[clock]
+                master = (masters.get(index, values[index]) & ~clock | values[data] & clock) & mask
+                masters[index] = master
+                res = values[index] & clock | master & ~clock & mask
+            else:
+                continue
+
+            if values[index] != res:
+                values[index] = res
+                queue.update(fan_out[fan_out_offsets[index]:fan_out_offsets[index + 1]])
+
+        self._queue = queue
+        return bool(queue)
+
+    def drain(self):
+        count = 0
+        if self._queue:
+            count += 1
+            while self.step():
+                count += 1
+        return count
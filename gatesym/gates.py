@@ -1,10 +1,11 @@
 """ a convenience layer for creating data in the core and debugging it """
 
 import collections
+import functools
 
 from decorator import decorator
 
-from gatesym import core
+from gatesym import analysis, core
 
 
 class Node(object):
@@ -89,6 +90,13 @@ class Gate(Node):
             input_.attach_output(self)
             input_.connect_output(self)
 
+    @classmethod
+    def existing(cls, network, index, name):
+        """ a handle to a gate that is already in the network, from a loaded netlist for example """
+        handle = cls.__new__(cls)
+        Gate.__init__(handle, network, index, name)
+        return handle
+
     def __repr__(self):
         return f'{self.__class__.__name__}<{self.index}>({self.read()})'
 
@@ -120,32 +128,82 @@ class Switch(Gate):
         self.network.write(self.index, value)
 
 
-class Nor(Gate):
+class Primitive(Gate):
+    """ a gate of any of the core's logic types, the RICH_TYPES need a network with rich_primitives """
 
-    def __init__(self, *inputs):
+    def __init__(self, type_, *inputs):
         assert inputs
         network = inputs[0].network
-        index = network.add_gate(core.NOR, self)
-        super().__init__(network, index, 'nor', inputs)
+        indexes = [_resolved_index(i) for i in inputs]
+        if None not in indexes:
+            # the network links it up, with structural hashing it may hand back an existing gate with these inputs
+            index = network.add_gate(type_, self, indexes)
+            super().__init__(network, index, type_)
+            for input_ in inputs:
+                input_.attach_output(self)
+        else:
+            # a placeholder input means a feedback loop that's still being built, those are never shared
+            # it's linked to each placeholder as it's replaced, so a dff's clock has to be there first to stay first
+            assert type_ != core.DFF or indexes[0] is not None, "a dff's clock must be connected first"
+            index = network.add_gate(type_, self)
+            super().__init__(network, index, type_, inputs)
+
+
+class Nor(Primitive):
+
+    def __init__(self, *inputs):
+        super().__init__(core.NOR, *inputs)
+
+
+def _resolved_index(node):
+    """ the index of the gate behind a node, or None if it's behind a placeholder that hasn't been replaced yet """
+    while not isinstance(node, Gate):
+        if isinstance(node, Link):
+            node = node.node
+        elif node.actual:
+            node = node.actual
+        else:
+            return None
+    return node.index
+
+
+def _rich(nodes):
+    return nodes[0].network.rich_primitives
 
 
 def Not(node):
+    if _rich([node]):
+        return Primitive(core.NOT, node)
     return Nor(node)
 
 
 def And(*inputs):
+    if _rich(inputs):
+        return Primitive(core.AND, *inputs)
     inputs = [Not(i) for i in inputs]
     return Nor(*inputs)
 
 
 def Or(*inputs):
+    if _rich(inputs):
+        return Primitive(core.OR, *inputs)
     return Not(Nor(*inputs))
 
 
 def Nand(*inputs):
+    if _rich(inputs):
+        return Primitive(core.NAND, *inputs)
     return Not(And(*inputs))
 
 
+def Xor(*inputs):
+    """ high when an odd number of the inputs are, only two inputs without rich primitives """
+    if _rich(inputs):
+        return Primitive(core.XOR, *inputs)
+    a, b = inputs
+    return Nor(Nor(a, b), And(a, b))
+
+
 class Link(Node):
     """ interesting steps along the path between two gates """
 
@@ -206,8 +264,12 @@ class Placeholder(Node):
         self.actual = input
         for o in self.attached:
             input.attach_output(o)
-        for o in self.connected:
-            input.connect_output(o)
+        index = _resolved_index(input)
+        if index is None:
+            for o in self.connected:
+                input.connect_output(o)
+        elif self.connected:
+            self.network.add_links([index] * len(self.connected), [o.index for o in self.connected])
 
     def __getattr__(self, name):
         assert self.actual
@@ -231,6 +293,105 @@ def link_factory(obj, name1, name2, block, is_output):
         return obj
 
 
+class Word(int):
+    """ the value of a word of gates as a python int, as passed to and from behavioral models """
+
+    def __new__(cls, value, width):
+        res = super().__new__(cls, value)
+        res.width = width
+        return res
+
+
+def _nodes(thing):
+    """ all the nodes in an arbitrarily nested structure """
+    if isinstance(thing, Node):
+        yield thing
+    elif isinstance(thing, (list, tuple)):
+        for item in thing:
+            yield from _nodes(item)
+
+
+def _is_word(thing):
+    return isinstance(thing, (list, tuple)) and thing and all(isinstance(item, Node) for item in thing)
+
+
+def _rebuild(thing, values):
+    """ swap the nodes in a nested structure for the next values, a list of nodes becomes a single Word """
+    if isinstance(thing, Node):
+        return next(values)
+    if _is_word(thing):
+        return Word(sum(next(values) << i for i in range(len(thing))), len(thing))
+    if isinstance(thing, (list, tuple)):
+        return [_rebuild(item, values) for item in thing]
+    return thing
+
+
+def _bits(thing, value):
+    """
+    the reverse of _rebuild, the values for each node in a nested structure from a matching structure of values
+    where a value is an int for a list of nodes and anything truthy for a single node
+    """
+    if isinstance(value, (list, tuple)):
+        for item, item_value in zip(thing, value):
+            yield from _bits(item, item_value)
+    elif isinstance(thing, Node):
+        yield bool(value)
+    else:
+        for i in range(len(thing)):
+            yield bool(value >> i & 1)
+
+
+DEFAULT_MEMO_SIZE = 256
+
+
+class Memo(object):
+    """ a least recently used cache of block outputs by inputs, with counters for tuning it's size """
+
+    def __init__(self, size):
+        assert size > 0
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._table = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._table)
+
+    def get(self, key):
+        """ the entry for key or None, counting a hit or a miss """
+        res = self._table.get(key)
+        if res is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._table.move_to_end(key)
+        return res
+
+    def put(self, key, value):
+        self._table[key] = value
+        self._evict()
+
+    def resize(self, size):
+        assert size > 0
+        self.size = size
+        self._evict()
+
+    def _evict(self):
+        while len(self._table) > self.size:
+            self._table.popitem(last=False)
+            self.evictions += 1
+
+    def get_stats(self):
+        return {
+            'size': self.size,
+            'entries': len(self._table),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
 class Block(object):
     """ wrapper around a functional block, intended to be used via the decorator below """
 
@@ -238,7 +399,205 @@ class Block(object):
         self.name = name
         self.outputs = []
         self.inputs = []
+        self.start = None
         self.size = None
+        self.network = None
+        self.args = None
+        self.result = None
+        self.model = None
+        self.children = []
+        self.parent = None
+        self.memo = None
+        self._macro = None
+        self._cut = None
+        self._output_types = None
+
+    @property
+    def behavioral(self):
+        return self._macro is not None and self.memo is None
+
+    @property
+    def memoized(self):
+        return self.memo is not None
+
+    def renumber(self, position):
+        """ follow the network being compacted, position maps an old index to it's new one, see Network.compact """
+        stop = position(self.start + self.size)
+        self.start = position(self.start)
+        self.size = stop - self.start
+        if self._cut:
+            self._cut = [(position(source), position(destination)) for source, destination in self._cut]
+            self._output_types = [(position(index), type_) for index, type_ in self._output_types]
+        for child in self.children:
+            child.renumber(position)
+
+    def _apply_network_options(self, deferred=False):
+        """
+        build this instance behavioral or memoized if it's name is in network.behavioral_blocks or memoized_blocks
+        if it's inputs aren't all connected yet, because one comes through a placeholder, it's done before the network
+        is next stepped or frozen, instances that still aren't connected then, or are inside a swapped block, are left
+        """
+        network = self.network
+        behavioral = self.model and self.name in network.behavioral_blocks
+        if not behavioral and self.name not in network.memoized_blocks:
+            return
+        if None in [_resolved_index(node) for node in _nodes(self.args)]:
+            if not deferred:
+                network.defer(functools.partial(self._apply_network_options, True))
+            return
+        parent = self.parent
+        while parent:
+            if parent._macro is not None:
+                return
+            parent = parent.parent
+        if behavioral:
+            self.set_behavioral()
+        else:
+            self.set_memoized(network.memoized_blocks[self.name])
+
+    def _swap_in(self, function):
+        """ cut the links into the block and drive it's outputs from a macro evaluating function instead """
+        network = self.network
+        inside = range(self.start, self.start + self.size)
+        outputs = [_resolved_index(node) for node in _nodes(self.result)]
+        assert all(index in inside for index in outputs)
+        self._swap_out_children()
+        inputs = [_resolved_index(node) for node in _nodes(self.args)]
+        assert None not in inputs, 'the inputs must all be connected first'
+        self._cut = []
+        for index in inside:
+            inputs_ = network.get_inputs(index)
+            # a dff's inputs are all cut so they go back in the same order
+            cut_all = index in outputs or (network.get_type(index) == core.DFF and not set(inputs_) <= set(inside))
+            for input_ in inputs_:
+                if input_ not in inside or cut_all:
+                    self._cut.append((input_, index))
+        for link in self._cut:
+            network.remove_link(*link)
+        self._output_types = [(index, network.get_type(index)) for index in set(outputs)]
+        for index, type_ in self._output_types:
+            network.set_gate_type(index, core.MACRO)
+        self._macro = network.add_macro(inputs, outputs, function)
+
+    def _swap_out_children(self):
+        """ put back the gates of any nested blocks that are swapped, they're covered by this one """
+        work = list(self.children)
+        while work:
+            child = work.pop()
+            child._swap_out()
+            work.extend(child.children)
+
+    def _swap_out(self):
+        """ undo _swap_in, going back to the gates """
+        if self._macro is None:
+            return
+        network = self.network
+        network.remove_macro(self._macro)
+        self._macro = None
+        self.memo = None
+        for index, type_ in self._output_types:
+            network.set_gate_type(index, type_)
+        for link in self._cut:
+            network.add_link(*link)
+        self._cut = None
+        self._output_types = None
+
+    def set_behavioral(self, behavioral=True):
+        """
+        swap the gates of this block instance for a single macro evaluating it's model, or back again
+
+        the links into the block are cut, leaving it's internals idle, and the output gates become MACRO gates
+        the model is called with the block's arguments with each gate as a bool and each list of gates as a Word
+        and returns it's results in the same shape
+        this edits the network, so it can only be done before it's frozen
+        """
+        if behavioral == self.behavioral:
+            return
+        assert not self.network._frozen, 'blocks can only be swapped before the network is frozen'
+        self._swap_out()
+        if behavioral:
+            assert self.model
+
+            def function(values):
+                values = iter(values)
+                return list(_bits(self.result, self.model(*[_rebuild(arg, values) for arg in self.args])))
+            self._swap_in(function)
+
+    def set_memoized(self, size=DEFAULT_MEMO_SIZE):
+        """
+        remember the outputs of this block instance for the last size different inputs, a size of 0 turns it off
+
+        the block must be combinational, it's gates are copied into a private network that is only settled when the
+        inputs aren't in the cache, otherwise the cached outputs are written straight away
+        like set_behavioral the block's gates in the main network are left idle and the outputs become MACRO gates
+        and it can only be done before the network is frozen
+        """
+        assert not self.network._frozen, 'blocks can only be swapped before the network is frozen'
+        if not size:
+            if self.memoized:
+                self._swap_out()
+            return
+        if self.memoized:
+            self.memo.resize(size)
+            return
+        self._swap_out()
+        # the copy needs the gates of nested blocks, not macros it can't take with it
+        self._swap_out_children()
+        private, inputs, outputs = self._extract()
+        memo = Memo(size)
+
+        def function(values):
+            key = bytes(values)
+            res = memo.get(key)
+            if res is None:
+                for index, value in zip(inputs, values):
+                    private.write(index, value)
+                private.drain()
+                res = [private.read(index) for index in outputs]
+                memo.put(key, res)
+            return res
+        self._swap_in(function)
+        self.memo = memo
+
+    def _extract(self):
+        """
+        copy the gates of this block into a new frozen network
+        returns it and the indexes of the block's inputs and outputs in it
+        """
+        network = self.network
+        gates = network._gates
+        inside = range(self.start, self.start + self.size)
+        private = core.Network(rich_primitives=network.rich_primitives)
+        mapping = {}
+        inputs = []
+        for index in (_resolved_index(node) for node in _nodes(self.args)):
+            assert index is not None, 'the inputs must all be connected first'
+            if index not in mapping:
+                mapping[index] = private.add_gate(core.SWITCH)
+            inputs.append(mapping[index])
+        for index in inside:
+            if gates[index] is not None and index not in mapping:
+                assert gates[index].type_ != core.MACRO, f'{self.name} has macros in it'
+                mapping[index] = private.add_gate(gates[index].type_)
+        for index in inside:
+            assert gates[index] is None or gates[index].type_ != core.DFF, f'{self.name} is not combinational'
+            if index not in mapping or gates[index].type_ not in [core.NOR] + core.RICH_TYPES:
+                continue
+            for input_ in network.get_inputs(index):
+                if input_ not in mapping:
+                    # only constants can come in from outside other than through the arguments
+                    assert gates[input_].type_ == core.TIE, f"{self.name} has inputs that are not it's arguments"
+                    mapping[input_] = private.add_gate(core.TIE)
+                private.add_link(mapping[input_], mapping[index])
+        outputs = [mapping[_resolved_index(node)] for node in _nodes(self.result)]
+
+        private.freeze()
+        for index, private_index in mapping.items():
+            if gates[index].type_ == core.TIE:
+                private.write(private_index, network.read(index))
+        private.drain()
+        assert analysis.is_acyclic(private._fan_out_offsets, private._fan_out), f'{self.name} is not combinational'
+        return private, inputs, outputs
 
 
 def _find_network(thing):
@@ -256,20 +615,47 @@ def _find_network(thing):
     return None
 
 
+# the blocks currently being built, innermost last
+_building = []
+
+
 def _block(func, *args):
     network = _find_network(args)
     old_size = network.get_size()
 
     block = Block(func.__name__)
+    block.start = old_size
+    if _building:
+        block.parent = _building[-1]
+        _building[-1].children.append(block)
+    else:
+        network.blocks.append(block)
 
     args = link_factory(args, f'{func.__name__}(', '', block, False)
-    res = func(*args)
+    _building.append(block)
+    try:
+        res = func(*args)
+    finally:
+        _building.pop()
     res = link_factory(res, '', ')', block, True)
 
     block.size = network.get_size() - old_size
+    block.network = network
+    block.args = args
+    block.result = res
+    block.model = func.model
+    block._apply_network_options()
 
     return res
 
 
-def block(func):
+def block(func=None, model=None):
+    """
+    turn a function of nodes into a block, model is an optional python version of it for behavioral simulation
+    see Block.set_behavioral, or add the block's name to network.behavioral_blocks to build every instance that way
+    similarly Block.set_memoized and network.memoized_blocks for caching the outputs of combinational blocks
+    """
+    if func is None:
+        return functools.partial(block, model=model)
+    func.model = model
     return decorator(_block, func)
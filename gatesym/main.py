@@ -1,4 +1,4 @@
-from gatesym import core
+from gatesym import cache, core
 from gatesym.computer import computer, symbols
 from gatesym.gates import Switch
 from gatesym.test_utils import BinaryOut
@@ -125,22 +125,25 @@ def assemble(symbols, variables, code):
     return res
 
 
-def main():
-    network = core.Network()
+def build_computer(network, rom_content):
     clock = Switch(network)
-    write, res = computer(clock, primes())
+    write, res = computer(clock, rom_content)
+    return clock, write, res
+
+
+def main():
+    network, (clock, write, res) = cache.build(build_computer, primes(), engine=core.COUNTING)
     print()
 
     res = BinaryOut(res)
     network.drain()
 
     last = 0
-    for i in range(5000):
-        clock.write(True)
-        network.drain()
-        output = write.read()
-        clock.write(False)
-        network.drain()
-        if output:
-            print(i - last, res.read())
-            last = i
+    cycle = 0
+    while cycle < 5000:
+        cycles, settle_steps = network.run_until(clock.index, write.index, True, 5000 - cycle)
+        if cycles is None:
+            break
+        cycle += cycles
+        print(cycle - 1 - last, res.read())
+        last = cycle - 1
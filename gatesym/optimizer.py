@@ -0,0 +1,188 @@
+"""
+simplify an editable network after it's been built and before it's frozen
+
+double inversions: nor(nor(x)) with nothing else on either input is replaced by x
+constants: a nor with a high tie input is a low tie, low tie inputs are dropped and a nor with no inputs is a high tie
+merging: nors with exactly the same inputs are merged into one
+dead logic: gates that can't affect any kept gate are deleted
+
+gates that are replaced take their handles with them, a Gate that used to point at a merged gate
+will point at the one it was merged into, handles to deleted gates are no longer valid
+switches, watched gates and macro inputs are always kept, ties are assumed never to be written after they're built
+replacing gates changes the timing of the network, so anything relying on glitches or races may behave differently
+"""
+
+import collections
+
+from gatesym import core
+
+Counts = collections.namedtuple('Counts', 'double_inversions constants merged dead')
+
+
+def _replace(network, old, new, replacements):
+    """ move everything that uses gate old over to gate new and delete old """
+    gates = network._gates
+    old_gate = gates[old]
+    new_gate = gates[new]
+    for output in old_gate.outputs:
+        if output != old:
+            inputs = gates[output].inputs
+            inputs[inputs.index(old)] = new
+            new_gate.outputs.append(output)
+            network._queue.add(output)
+    old_gate.outputs[:] = [output for output in old_gate.outputs if output == old]
+    _delete(network, old)
+    replacements[old] = new
+
+    for cookie in old_gate.cookies:
+        if cookie is not None:
+            cookie.index = new
+            new_gate.cookies.add(cookie)
+    network._watches = [
+        (name, new if index == old else index, negate) for name, index, negate in network._watches
+    ]
+    for macro in network._macros:
+        macro.inputs = [new if index == old else index for index in macro.inputs]
+
+
+def _delete(network, index):
+    """ unlink a gate and remove it """
+    gates = network._gates
+    gate = gates[index]
+    for input_ in gate.inputs:
+        if input_ != index:
+            gates[input_].outputs.remove(index)
+    for output in gate.outputs:
+        if output != index:
+            gates[output].inputs.remove(index)
+            network._queue.add(output)
+    gate.inputs.clear()
+    gate.outputs.clear()
+    network.remove_gate(index)
+    network._queue.discard(index)
+
+
+def _live(gate):
+    return gate is not None and gate.type_ == core.NOR
+
+
+def _remove_double_inversions(network, replacements):
+    gates = network._gates
+    count = 0
+    for index, gate in enumerate(gates):
+        if _live(gate) and len(gate.inputs) == 1:
+            inner = gate.inputs[0]
+            inner_gate = gates[inner]
+            if _live(inner_gate) and len(inner_gate.inputs) == 1 and inner_gate.inputs[0] not in (index, inner):
+                _replace(network, index, inner_gate.inputs[0], replacements)
+                count += 1
+    return count
+
+
+def _fold_constants(network, replacements):
+    gates = network._gates
+    ties = {}
+    for index, gate in enumerate(gates):
+        if gate is not None and gate.type_ == core.TIE:
+            ties.setdefault(bool(network._values[index]), index)
+
+    def tie(value):
+        if value not in ties:
+            index = network.add_gate(core.TIE)
+            network.write(index, value)
+            replacements.pop(index, None)  # it may be reusing the slot of a gate we've replaced
+            ties[value] = index
+        return ties[value]
+
+    count = 0
+    for index, gate in enumerate(gates):
+        if not _live(gate):
+            continue
+        constant_inputs = [i for i in gate.inputs if gates[i].type_ == core.TIE]
+        if any(network._values[i] for i in constant_inputs):
+            _replace(network, index, tie(False), replacements)
+            count += 1
+        else:
+            for input_ in constant_inputs:
+                gate.inputs.remove(input_)
+                gates[input_].outputs.remove(index)
+            if not gate.inputs:
+                _replace(network, index, tie(True), replacements)
+                count += 1
+    return count
+
+
+def _merge(network, replacements):
+    gates = network._gates
+    seen = {}
+    count = 0
+    for index, gate in enumerate(gates):
+        if _live(gate) and gate.inputs:
+            key = tuple(sorted(gate.inputs))
+            if index in key:
+                continue  # it's value depends on itself, so it's not interchangeable
+            if key in seen:
+                _replace(network, index, seen[key], replacements)
+                count += 1
+            else:
+                seen[key] = index
+    return count
+
+
+def _remove_dead(network, keep):
+    gates = network._gates
+    live = set(keep)
+    live.update(index for index, gate in enumerate(gates) if gate is not None and gate.type_ == core.SWITCH)
+    live.update(index for name, index, negate in network._watches)
+    live.update(index for macro in network._macros for index in macro.inputs)
+    work = list(live)
+    while work:
+        for input_ in gates[work.pop()].inputs:
+            if input_ not in live:
+                live.add(input_)
+                work.append(input_)
+
+    dead = [index for index, gate in enumerate(gates) if gate is not None and index not in live]
+    for index in dead:
+        _delete(network, index)
+    return len(dead)
+
+
+def optimize(network, keep):
+    """
+    simplify a network in place, keep is the gates (or indexes) whose behaviour matters
+    returns Counts of the gates removed by each optimization
+    """
+    assert not network._frozen
+    # we edit links directly, so structural hashing's record of them would go stale
+    network._structure.clear()
+    network._structure_keys.clear()
+    keep = list(keep)
+    replacements = {}
+    totals = [0, 0, 0]
+    while True:
+        counts = [
+            _remove_double_inversions(network, replacements),
+            _fold_constants(network, replacements),
+            _merge(network, replacements),
+        ]
+        totals = [a + b for a, b in zip(totals, counts)]
+        if not any(counts):
+            break
+
+    # the kept gates may themselves have been replaced, handles follow along but plain indexes need looking up
+    indexes = []
+    for gate in keep:
+        if isinstance(gate, int):
+            while gate in replacements:
+                gate = replacements[gate]
+        else:
+            gate = gate.index
+        indexes.append(gate)
+    return Counts(*totals, _remove_dead(network, indexes))
+
+
+def count_gates(network, start=0, stop=None):
+    """ the number of gates in a range of indexes, for example those created by a block """
+    gates = network._gates[start:stop]
+    return sum(gate is not None for gate in gates)
@@ -0,0 +1,185 @@
+"""
+simulate a frozen network split across several processes
+
+the gates are partitioned into balanced regions with few links between them (see analysis.partition) and each region
+is run by it's own worker process, gate values live in a shared memory block so the controlling process can read and
+write them directly
+
+a step is two phases separated by a barrier, first every worker reads the gates outside it's region that feed it and
+queues the gates of theirs that changed, then it evaluates it's queue in place and publishes the toggled gates
+so links inside a region behave exactly like the event engine and links between regions see the values from the
+start of the step, the results are deterministic whatever order the workers run in
+"""
+
+import multiprocessing
+from array import array
+from multiprocessing import shared_memory
+
+from gatesym import analysis, core
+
+STEP, STOP = ['step', 'stop']
+
+
+def _external_inputs(owners, part, types, fan_in_offsets, fan_in):
+    """
+    the gates a part has to watch, those outside it that feed it's gates
+    plus any switches or ties feeding it as only the controller writes those
+    """
+    external = set()
+    for gate, owner in enumerate(owners):
+        if owner == part:
+            external.update(
+                i for i in fan_in[fan_in_offsets[gate]:fan_in_offsets[gate + 1]]
+                if owners[i] != part or types[i] != core._NOR_CODE
+            )
+    return sorted(external)
+
+
+def _worker(
+    connection, barrier, memory_name, part, owners, types, fan_in_offsets, fan_in, fan_out_offsets, fan_out,
+    values, queue,
+):
+    """ the main loop of a worker process, runs one region of the network a step at a time as the controller asks """
+    memory = shared_memory.SharedMemory(name=memory_name)
+    try:
+        shared = memory.buf
+        # our own copy of the values as they were when the network was split, not whatever is in shared memory now
+        # as the controller may already have written some, only our region is written back
+        values = bytearray(values)
+        fan_in = memoryview(fan_in)
+        fan_out = memoryview(fan_out)
+        external = _external_inputs(owners, part, types, fan_in_offsets, fan_in)
+        get_value = values.__getitem__
+        nor = core._NOR_CODE
+
+        queue = set(queue)
+        evaluations = 0
+        while connection.recv() == STEP:
+            # pick up what the other regions and the controller changed last step
+            for input_ in external:
+                value = shared[input_]
+                if values[input_] != value:
+                    values[input_] = value
+                    queue.update(
+                        i for i in fan_out[fan_out_offsets[input_]:fan_out_offsets[input_ + 1]] if owners[i] == part
+                    )
+            barrier.wait()
+
+            evaluations += len(queue)
+            toggled = []
+            next_queue = set()
+            for index in queue:
+                if types[index] == nor:
+                    res = not any(map(get_value, fan_in[fan_in_offsets[index]:fan_in_offsets[index + 1]]))
+
+                    if values[index] != res:
+                        values[index] = res
+                        toggled.append(index)
+                        next_queue.update(
+                            i for i in fan_out[fan_out_offsets[index]:fan_out_offsets[index + 1]] if owners[i] == part
+                        )
+            for index in toggled:
+                shared[index] = values[index]
+            queue = next_queue
+            connection.send((bool(toggled or queue), evaluations))
+        del shared
+    finally:
+        memory.close()
+
+
+class PartitionedNetwork(object):
+    """
+    run a frozen network across several worker processes, gate indexes are shared with the source network
+
+    close it (or use it as a context manager) to stop the workers and free the shared memory
+    """
+
+    def __init__(self, network, processes=None, context=None):
+        assert network._frozen
+        assert not network._macros
+        assert not network.has_rich_gates(), 'the workers only handle nors'
+        processes = processes or multiprocessing.cpu_count()
+        context = context or multiprocessing.get_context()
+        size = len(network._types)
+        self.processes = processes
+        self.owners = analysis.partition(
+            network._fan_in_offsets, network._fan_in, network._fan_out_offsets, network._fan_out,
+            network.get_levels(), processes,
+        )
+        self.cut = analysis.cut_size(network._fan_out_offsets, network._fan_out, self.owners)
+
+        self._memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._values = self._memory.buf[:size]
+        self._values[:] = network._values
+        self._evaluations = 0
+
+        # plain copies, the network's arrays might be views of a memory map which can't be sent to a process
+        arrays = [bytes(network._types)] + [
+            array('i', memoryview(links).cast('B').tobytes())
+            for links in [network._fan_in_offsets, network._fan_in, network._fan_out_offsets, network._fan_out]
+        ]
+        initial = bytes(network._values)
+        barrier = context.Barrier(processes)
+        self._connections = []
+        self._workers = []
+        for part in range(processes):
+            queue = [i for i in network._queue if self.owners[i] == part]
+            connection, child = context.Pipe()
+            worker = context.Process(
+                target=_worker,
+                args=(child, barrier, self._memory.name, part, self.owners, *arrays, initial, queue),
+                daemon=True,
+            )
+            worker.start()
+            self._connections.append(connection)
+            self._workers.append(worker)
+
+    def read(self, gate_index):
+        return bool(self._values[gate_index])
+
+    def write(self, gate_index, value):
+        """ set a gate directly, the workers pick it up at the start of the next step """
+        self._values[gate_index] = bool(value)
+
+    def step(self):
+        for connection in self._connections:
+            connection.send(STEP)
+        busy = False
+        evaluations = 0
+        for connection in self._connections:
+            more, count = connection.recv()
+            busy = busy or more
+            evaluations += count
+        self._evaluations = evaluations
+        return busy
+
+    def drain(self):
+        count = 1
+        while self.step():
+            count += 1
+        return count
+
+    def get_stats(self):
+        return {
+            'processes': self.processes,
+            'cut': self.cut,
+            'evaluations': self._evaluations,
+        }
+
+    def close(self):
+        if self._workers is None:
+            return
+        for connection in self._connections:
+            connection.send(STOP)
+        for worker in self._workers:
+            worker.join()
+        self._workers = None
+        self._values.release()
+        self._memory.close()
+        self._memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,129 @@
+"""
+attribute the evaluation and toggle counts of a profiled network (see Network.set_profiling) to the blocks that built it
+
+each block's gates are the range of indexes created while it was being built, which includes it's nested blocks
+instances of a block at the same path through the hierarchy (eg cpu_core/register/ms_d_flop) are added together
+
+    python -m gatesym.profiler [cycles] [json path]
+
+profiles the primes program running on computer() and prints the busiest blocks
+"""
+
+import collections
+import itertools
+import json
+import sys
+from array import array
+
+from gatesym import core
+from gatesym.computer import computer
+from gatesym.gates import Switch
+from gatesym.main import primes
+
+Row = collections.namedtuple(
+    'Row', 'path instances gates evaluations toggles self_evaluations evaluations_per_cycle toggles_per_cycle',
+)
+
+# the path of the gates that aren't in any block
+OUTSIDE = '(outside blocks)'
+
+
+def _prefix(counts):
+    """ running totals, so the total over indexes [a, b) is res[b] - res[a] """
+    return array('q', itertools.accumulate(counts, initial=0))
+
+
+def report(network, sort='evaluations'):
+    """ a Row per block path, sorted by the named field with the biggest first """
+    profile = network.profile
+    assert profile is not None, 'profiling is not on'
+    totals = {
+        'gates': _prefix(code != 0 for code in network._types),
+        'evaluations': _prefix(profile.evaluations),
+        'toggles': _prefix(profile.toggles),
+    }
+
+    def total(name, start, stop):
+        return totals[name][stop] - totals[name][start]
+
+    sums = collections.defaultdict(lambda: [0, 0, 0, 0, 0])  # instances gates evaluations toggles self_evaluations
+    work = [('', block) for block in network.blocks]
+    while work:
+        parent, block = work.pop()
+        path = f'{parent}/{block.name}' if parent else block.name
+        start, stop = block.start, block.start + block.size
+        evaluations = total('evaluations', start, stop)
+        row = sums[path]
+        row[0] += 1
+        row[1] += total('gates', start, stop)
+        row[2] += evaluations
+        row[3] += total('toggles', start, stop)
+        row[4] += evaluations - sum(
+            total('evaluations', child.start, child.start + child.size) for child in block.children
+        )
+        work.extend((path, child) for child in block.children)
+
+    outside = [0, 0, 0, 0, 0]
+    outside[1:4] = [totals[name][-1] for name in ['gates', 'evaluations', 'toggles']]
+    for block in network.blocks:
+        for i, name in enumerate(['gates', 'evaluations', 'toggles'], 1):
+            outside[i] -= total(name, block.start, block.start + block.size)
+    outside[4] = outside[2]
+    if outside[1]:
+        sums[OUTSIDE] = outside
+
+    cycles = profile.cycles
+    rows = [
+        Row(
+            path, *counts,
+            counts[2] / cycles if cycles else None,
+            counts[3] / cycles if cycles else None,
+        )
+        for path, counts in sums.items()
+    ]
+    rows.sort(key=lambda row: (-getattr(row, sort), row.path))
+    return rows
+
+
+def format_report(rows, limit=None):
+    """ a text table of rows, the first limit of them if given """
+    rows = rows[:limit]
+    width = max([len('path')] + [len(row.path) for row in rows])
+    lines = [
+        f'{"path":{width}} {"instances":>9} {"gates":>7} {"evals":>10} {"toggles":>10} {"self":>10} {"evals/cyc":>10}',
+    ]
+    for row in rows:
+        per_cycle = '-' if row.evaluations_per_cycle is None else f'{row.evaluations_per_cycle:.1f}'
+        lines.append(
+            f'{row.path:{width}} {row.instances:9} {row.gates:7} {row.evaluations:10} {row.toggles:10} '
+            f'{row.self_evaluations:10} {per_cycle:>10}',
+        )
+    return '\n'.join(lines)
+
+
+def dump_json(network, f, sort='evaluations'):
+    """ write the report for a network as json to an open file """
+    json.dump({
+        'cycles': network.profile.cycles,
+        'blocks': [row._asdict() for row in report(network, sort)],
+    }, f, indent=2)
+
+
+def main(cycles=1000, json_path=None):
+    network = core.Network()
+    clock = Switch(network)
+    computer(clock, primes())
+    network.freeze(core.COUNTING)
+    network.drain()
+    network.set_profiling()
+    network.run_cycles(clock.index, cycles)
+
+    print(format_report(report(network), limit=30))
+    if json_path:
+        with open(json_path, 'w') as f:
+            dump_json(network, f)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 1000, args[1] if len(args) > 1 else None)
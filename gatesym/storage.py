@@ -0,0 +1,62 @@
+"""
+a minimal binary container for flat arrays, used for saved simulation state and netlists
+
+layout, the header is little endian and the section data is in native byte order:
+    magic (4 bytes), version (u32), section count (u32), padding (u32)
+    per section: name (16 bytes, nul padded), array typecode (1 byte), padding (7 bytes), offset (u64), length (u64)
+    the section data, each starting on an 8 byte boundary so it can be used in place from a memory map
+"""
+
+import mmap
+import struct
+
+_HEADER = struct.Struct('<4sIII')
+_ENTRY = struct.Struct('<16sc7xQQ')
+_ALIGN = 8
+
+
+def _aligned(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def write(path, magic, version, sections):
+    """ write a file of (name, array typecode, data) sections, data can be anything supporting the buffer protocol """
+    entries = []
+    offset = _aligned(_HEADER.size + _ENTRY.size * len(sections))
+    for name, typecode, data in sections:
+        data = memoryview(data).cast('B')
+        entries.append((name, typecode, offset, data))
+        offset = _aligned(offset + len(data))
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(magic, version, len(sections), 0))
+        for name, typecode, offset, data in entries:
+            f.write(_ENTRY.pack(name.encode(), typecode.encode(), offset, len(data) // struct.calcsize(typecode)))
+        for name, typecode, offset, data in entries:
+            f.write(bytes(offset - f.tell()))
+            f.write(data)
+
+
+def read(path, magic, version):
+    """
+    memory map a file written by write and return a dict of name -> read only memoryview of each section
+    the map stays open for as long as any of the views are alive
+    """
+    with open(path, 'rb') as f:
+        if not f.seek(0, 2):
+            raise ValueError(f'{path} is empty')
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    buffer = memoryview(mapped)
+    file_magic, file_version, count, _ = _HEADER.unpack_from(buffer)
+    if file_magic != magic:
+        raise ValueError(f'{path} is not a {magic.decode()} file')
+    if file_version != version:
+        raise ValueError(f'{path} is version {file_version}, expected {version}')
+
+    sections = {}
+    for i in range(count):
+        name, typecode, offset, length = _ENTRY.unpack_from(buffer, _HEADER.size + _ENTRY.size * i)
+        typecode = typecode.decode()
+        size = length * struct.calcsize(typecode)
+        sections[name.rstrip(b'\0').decode()] = buffer[offset:offset + size].cast(typecode)
+    return sections
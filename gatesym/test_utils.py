@@ -36,6 +36,15 @@ class BinaryIn(collections.Sequence):
         for i, line in enumerate(self.switches):
             line.watch(f'{name}_{i}')
 
+    def write_lanes(self, network, values):
+        """ write a different python int into each lane of a ParallelNetwork, lane i gets values[i] """
+        for bit, switch in enumerate(self.switches):
+            word = 0
+            for lane, value in enumerate(values):
+                if value >> bit & 1:
+                    word |= 1 << lane
+            network.write(switch.index, word)
+
 
 class BinaryOut(object):
     """ read a block of gates as a python int """
@@ -54,3 +63,16 @@ class BinaryOut(object):
     def watch(self, name):
         for i, line in enumerate(self.gates):
             line.watch(f'{name}_{i}')
+
+    def read_lanes(self, network):
+        """ read the gates in every lane of a ParallelNetwork as a list of python ints, one per lane """
+        res = [0] * network.lanes
+        for bit, gate in enumerate(self.gates):
+            word = network.read(gate.index)
+            lane = 0
+            while word:
+                if word & 1:
+                    res[lane] |= 1 << bit
+                word >>= 1
+                lane += 1
+        return res
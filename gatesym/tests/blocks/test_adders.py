@@ -1,11 +1,14 @@
 import random
 
+import pytest
+
 from gatesym import core, gates, test_utils
 from gatesym.blocks import adders
 
 
-def test_half_adder():
-    network = core.Network()
+@pytest.mark.parametrize('rich', [False, True])
+def test_half_adder(rich):
+    network = core.Network(rich_primitives=rich)
     a = gates.Switch(network)
     b = gates.Switch(network)
     r, c = adders.half_adder(a, b)
@@ -36,8 +39,9 @@ def test_half_adder():
     assert c.read()
 
 
-def test_full_adder():
-    network = core.Network()
+@pytest.mark.parametrize('rich', [False, True])
+def test_full_adder(rich):
+    network = core.Network(rich_primitives=rich)
     a = gates.Switch(network)
     b = gates.Switch(network)
     c = gates.Switch(network)
@@ -101,8 +105,9 @@ def test_full_adder():
     assert co.read()
 
 
-def test_ripple_adder():
-    network = core.Network()
+@pytest.mark.parametrize('rich', [False, True])
+def test_ripple_adder(rich):
+    network = core.Network(rich_primitives=rich)
     a = test_utils.BinaryIn(network, 8)
     b = test_utils.BinaryIn(network, 8)
     r, c = adders.ripple_adder(a, b)
@@ -119,8 +124,9 @@ def test_ripple_adder():
         assert r.read() == (v1 + v2) % 256
 
 
-def test_ripple_incr():
-    network = core.Network()
+@pytest.mark.parametrize('rich', [False, True])
+def test_ripple_incr(rich):
+    network = core.Network(rich_primitives=rich)
     a = test_utils.BinaryIn(network, 8)
     r, c = adders.ripple_incr(a)
     r = test_utils.BinaryOut(r)
@@ -139,10 +145,11 @@ def test_ripple_incr():
     assert r.read() == 0
 
 
-def test_ripple_sum():
+@pytest.mark.parametrize('rich', [False, True])
+def test_ripple_sum(rich):
     count = random.randrange(2, 10)
 
-    network = core.Network()
+    network = core.Network(rich_primitives=rich)
     inputs = [test_utils.BinaryIn(network, 8) for i in range(count)]
     res, carry = adders.ripple_sum(*inputs)
     res = test_utils.BinaryOut(res)
@@ -157,8 +164,9 @@ def test_ripple_sum():
         assert res.read() == (sum(values) % 256)
 
 
-def test_ripple_subtractor():
-    network = core.Network()
+@pytest.mark.parametrize('rich', [False, True])
+def test_ripple_subtractor(rich):
+    network = core.Network(rich_primitives=rich)
     a = test_utils.BinaryIn(network, 8)
     b = test_utils.BinaryIn(network, 8)
     r, c = adders.ripple_subtractor(a, b)
@@ -173,3 +181,22 @@ def test_ripple_subtractor():
         network.drain()
         assert c.read() == (v1 < v2)
         assert r.read() == (v1 - v2) % 256
+
+
+@pytest.mark.parametrize('rich', [False, True])
+def test_ripple_adder_exhaustive(rich):
+    network = core.Network(rich_primitives=rich)
+    a = test_utils.BinaryIn(network, 8)
+    b = test_utils.BinaryIn(network, 8)
+    r, c = adders.ripple_adder(a, b)
+    r = test_utils.BinaryOut(r)
+    c = test_utils.BinaryOut([c])
+    network.freeze()
+
+    # every pair of inputs, one per lane
+    parallel = core.ParallelNetwork(network, 256 * 256)
+    a.write_lanes(parallel, [i % 256 for i in range(256 * 256)])
+    b.write_lanes(parallel, [i // 256 for i in range(256 * 256)])
+    parallel.drain()
+    assert r.read_lanes(parallel) == [(i % 256 + i // 256) % 256 for i in range(256 * 256)]
+    assert c.read_lanes(parallel) == [int(i % 256 + i // 256 >= 256) for i in range(256 * 256)]
@@ -1,5 +1,7 @@
 import random
 
+import pytest
+
 from gatesym import core, gates, test_utils
 from gatesym.blocks import latches
 
@@ -105,11 +107,12 @@ def test_ms_d_flop_timing():
     assert flop_.read()
 
 
-def test_register():
+@pytest.mark.parametrize('primitive', [False, True])
+def test_register(primitive):
     network = core.Network()
     clock = gates.Switch(network)
     data = test_utils.BinaryIn(network, 8)
-    register = latches.register(data, clock)
+    register = latches.register(data, clock, primitive=primitive)
     res = test_utils.BinaryOut(register)
     network.drain()
     assert res.read() == 0
@@ -137,3 +140,67 @@ def test_register():
     clock.write(False)
     network.drain()
     assert res.read() == v2
+
+
+def test_dff_timing():
+    network = core.Network()
+    clock = gates.Switch(network)
+    data = gates.Switch(network)
+    flop = gates.Primitive(core.DFF, clock, data)
+    network.drain()
+    assert not flop.read()
+
+    # clock a 1 through
+    data.write(True)
+    network.drain()
+    assert not flop.read()  # data has no impact
+    clock.write(True)
+    network.drain()
+    assert not flop.read()  # clock high data in
+    clock.write(False)
+    data.write(False)
+    network.drain()
+    assert flop.read()  # clock low stored data out
+
+    # and back to 0
+    clock.write(True)
+    network.drain()
+    assert flop.read()  # clock high data in
+    data.write(True)
+    network.drain()
+    assert flop.read()  # the last data before the clock goes low is the one kept
+    data.write(False)
+    network.drain()
+    clock.write(False)
+    data.write(True)
+    network.drain()
+    assert not flop.read()  # clock low stored data out
+
+
+@pytest.mark.parametrize('negate_in', [False, True])
+@pytest.mark.parametrize('negate_out', [False, True])
+def test_register_primitive_matches(negate_in, negate_out):
+    network = core.Network()
+    clock = gates.Switch(network)
+    data = test_utils.BinaryIn(network, 8)
+    nors = test_utils.BinaryOut(latches.register(data, clock, negate_in, negate_out, primitive=False))
+    start = network.get_size()
+    dffs = test_utils.BinaryOut(latches.register(data, clock, negate_in, negate_out, primitive=True))
+    assert network.get_size() - start == (8 if negate_in == negate_out else 16)
+    network.drain()
+    assert dffs.read() == nors.read()
+
+    for i in range(20):
+        data.write(random.randrange(256))
+        clock.write(random.choice([False, True]))
+        network.drain()
+        assert dffs.read() == nors.read()
+
+
+def test_register_follows_network():
+    network = core.Network(rich_primitives=True)
+    clock = gates.Switch(network)
+    data = test_utils.BinaryIn(network, 8)
+    start = network.get_size()
+    latches.register(data, clock)
+    assert network.get_size() - start == 8
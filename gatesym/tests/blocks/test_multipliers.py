@@ -20,3 +20,21 @@ def test_ripple_multiplier():
         network.drain()
         assert c.read() == (v1 * v2 >= 256)
         assert r.read() == (v1 * v2) % 256
+
+
+def test_ripple_multiplier_exhaustive():
+    network = core.Network()
+    a = test_utils.BinaryIn(network, 8)
+    b = test_utils.BinaryIn(network, 8)
+    r, c = multipliers.ripple_multiplier(a, b)
+    r = test_utils.BinaryOut(r)
+    c = test_utils.BinaryOut([c])
+    network.freeze()
+
+    # every pair of inputs, one per lane
+    parallel = core.ParallelNetwork(network, 256 * 256)
+    a.write_lanes(parallel, [i % 256 for i in range(256 * 256)])
+    b.write_lanes(parallel, [i // 256 for i in range(256 * 256)])
+    parallel.drain()
+    assert r.read_lanes(parallel) == [(i % 256) * (i // 256) % 256 for i in range(256 * 256)]
+    assert c.read_lanes(parallel) == [int((i % 256) * (i // 256) >= 256) for i in range(256 * 256)]
@@ -0,0 +1,57 @@
+from gatesym import analysis, core
+
+
+def build(links, size):
+    network = core.Network()
+    for i in range(size):
+        network.add_gate(core.NOR)
+    for source, destination in links:
+        network.add_link(source, destination)
+    network.freeze()
+    return network
+
+
+def test_strongly_connected_components():
+    # 0 -> 1 <-> 2 -> 3 -> 3
+    network = build([(0, 1), (1, 2), (2, 1), (2, 3), (3, 3)], 4)
+    components = analysis.strongly_connected_components(network._fan_out_offsets, network._fan_out)
+    assert [sorted(c) for c in components] == [[0], [1, 2], [3]]
+
+
+def test_levelize():
+    # 0 -> 1 <-> 2 -> 3, 0 -> 3
+    network = build([(0, 1), (1, 2), (2, 1), (2, 3), (0, 3)], 4)
+    levels = network.get_levels()
+    assert list(levels.order) == [0, 1, 2, 3]
+    assert levels.component_starts == [0, 1, 3]
+    assert levels.component_ends == [1, 3, 4]
+    assert list(levels.feedback) == [-1, -1, 1, -1]
+    assert list(levels.ranks) == [0, 1, 1, 2]
+    assert analysis.component_at(levels, 2) == 1
+
+
+def test_levelize_entry():
+    # the loop 1 <-> 2 is entered at 2 so that's where it's order starts
+    network = build([(0, 2), (1, 2), (2, 1)], 3)
+    levels = network.get_levels()
+    assert list(levels.order) == [0, 2, 1]
+    assert list(levels.feedback) == [-1, 1, -1]
+
+
+def test_partition():
+    # two chains 0 -> 1 -> 2 -> 3 and 4 -> 5 -> 6 -> 7 joined by 3 -> 4, the cut goes at the join
+    network = build([(0, 1), (1, 2), (2, 3), (3, 4), (4, 5), (5, 6), (6, 7)], 8)
+    owners = analysis.partition(
+        network._fan_in_offsets, network._fan_in, network._fan_out_offsets, network._fan_out, network.get_levels(), 2,
+    )
+    assert list(owners) == [0, 0, 0, 0, 1, 1, 1, 1]
+    assert analysis.cut_size(network._fan_out_offsets, network._fan_out, owners) == 1
+
+
+def test_is_acyclic():
+    network = build([(0, 1), (1, 2), (0, 2)], 3)
+    assert analysis.is_acyclic(network._fan_out_offsets, network._fan_out)
+    network = build([(0, 1), (1, 2), (2, 1)], 3)
+    assert not analysis.is_acyclic(network._fan_out_offsets, network._fan_out)
+    network = build([(0, 1), (1, 1)], 2)
+    assert not analysis.is_acyclic(network._fan_out_offsets, network._fan_out)
@@ -0,0 +1,24 @@
+from gatesym import benchmark
+from gatesym.benchmark import Result
+
+
+def test_run():
+    results = benchmark.run('chain', quick=True)
+    assert {result.name for result in results} >= {'chain.event.drain', 'chain.counting.toggles'}
+    assert all(result.value > 0 for result in results)
+
+
+def test_compare():
+    baseline = benchmark.to_json([
+        Result('a', 1.0, 's', 'lower'),
+        Result('b', 100.0, 'cycles/s', 'higher'),
+        Result('c', 1.0, 's', 'lower'),
+    ])['results']
+    results = [
+        Result('a', 1.5, 's', 'lower'),
+        Result('b', 50.0, 'cycles/s', 'higher'),
+        Result('c', 1.1, 's', 'lower'),
+        Result('d', 5.0, 's', 'lower'),
+    ]
+    regressions = benchmark.compare(results, baseline, threshold=0.2)
+    assert [(result.name, base, ratio) for result, base, ratio in regressions] == [('a', 1.0, 1.5), ('b', 100.0, 2.0)]
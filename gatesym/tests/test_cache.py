@@ -0,0 +1,57 @@
+import os
+
+from gatesym import cache, test_utils
+from gatesym.blocks import adders
+from gatesym.gates import Switch
+
+calls = []
+
+
+def build_adder(network, size):
+    calls.append(size)
+    a = test_utils.BinaryIn(network, size)
+    b = test_utils.BinaryIn(network, size)
+    r, c = adders.ripple_adder(a, b)
+    return list(a), (list(b), r), c
+
+
+def add(network, ports, v1, v2):
+    a, (b, r), c = ports
+    for bit, switch in enumerate(a):
+        switch.write(v1 >> bit & 1)
+    for bit, switch in enumerate(b):
+        switch.write(v2 >> bit & 1)
+    network.drain()
+    return test_utils.BinaryOut(r).read(), c.read()
+
+
+def test_build(tmp_path):
+    calls.clear()
+    network, ports = cache.build(build_adder, 4, cache_dir=tmp_path)
+    assert add(network, ports, 5, 6) == (11, False)
+    assert calls == [4]
+
+    # the second time it comes from the cache
+    network, ports = cache.build(build_adder, 4, cache_dir=tmp_path)
+    assert calls == [4]
+    assert isinstance(ports[0][0], Switch)
+    assert add(network, ports, 9, 8) == (1, True)
+
+    # but different arguments are a different build
+    cache.build(build_adder, 5, cache_dir=tmp_path)
+    assert calls == [4, 5]
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_eviction(tmp_path):
+    calls.clear()
+    cache.build(build_adder, 4, cache_dir=tmp_path)
+    size = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    os.utime(tmp_path / os.listdir(tmp_path)[0], (0, 0))
+
+    # room for the two larger entries, so the oldest goes
+    cache.build(build_adder, 5, cache_dir=tmp_path, max_size=size * 3)
+    cache.build(build_adder, 6, cache_dir=tmp_path, max_size=size * 3)
+    assert len(os.listdir(tmp_path)) == 2
+    cache.build(build_adder, 4, cache_dir=tmp_path, max_size=size * 3)
+    assert calls == [4, 5, 6, 4]
@@ -1,8 +1,39 @@
+import logging
+import random
+
 import pytest
 
 from gatesym import core
 
 
+def random_network(seed, switches=4, nors=40, links=80, loops=True):
+    """ a random tangle of switches and nors, loops and all unless asked otherwise """
+    rand = random.Random(seed)
+    network = core.Network()
+    sources = [network.add_gate(core.SWITCH) for i in range(switches)]
+    gates = [network.add_gate(core.NOR) for i in range(nors)]
+    for i in range(links):
+        destination = rand.choice(gates)
+        if loops:
+            source = rand.choice(sources + gates)
+        else:
+            source = rand.choice(sources + gates[:gates.index(destination)])
+        network.add_link(source, destination)
+    return network, sources
+
+
+def trace(network, sources, seed, steps=200):
+    """ randomly toggle the sources and record the values after every step """
+    rand = random.Random(seed)
+    res = []
+    for i in range(steps):
+        if rand.random() < 0.2:
+            network.write(rand.choice(sources), rand.random() < 0.5)
+        network.step()
+        res.append([network.read(index) for index in range(network.get_size())])
+    return res
+
+
 def test_tie():
     network = core.Network()
     idx = network.add_gate(core.TIE)
@@ -158,3 +189,656 @@ def test_drain():
     network.write(idx_0, False)
     network.write(idx_0, True)
     assert network.drain() == 1
+
+
+def test_freeze():
+    network = core.Network()
+    idx_0 = network.add_gate(core.SWITCH)
+    idx_1 = network.add_gate(core.NOR)
+    idx_2 = network.add_gate(core.NOR)
+    network.add_link(idx_0, idx_1)
+    network.add_link(idx_1, idx_2)
+    network.freeze()
+
+    assert network.drain() == 1
+    assert network.read(idx_0) is False
+    assert network.read(idx_1) is True
+    assert network.read(idx_2) is False
+
+    network.write(idx_0, True)
+    assert network.step() is True
+    assert network.read(idx_1) is False
+    assert network.read(idx_2) is False
+    assert network.step() is False
+    assert network.read(idx_2) is True
+
+    with pytest.raises(AssertionError):
+        network.add_gate(core.NOR)
+    with pytest.raises(AssertionError):
+        network.add_link(idx_0, idx_2)
+
+
+def test_add_gates_and_links():
+    network = core.Network()
+    first = network.add_gate(core.NOR)
+    network.remove_gate(first)
+    # bulk gates don't reuse the free slot
+    indexes = network.add_gates([core.SWITCH, core.SWITCH, core.NOR, core.NOR])
+    assert indexes == range(1, 5)
+    a, b, c, d = indexes
+    network.add_links([a, b, c], [c, c, d])
+    assert network.get_inputs(c) == [a, b]
+    assert network.get_inputs(d) == [c]
+    network.drain()
+    assert network.read(c) is True
+    assert network.read(d) is False
+    network.write(b, True)
+    network.drain()
+    assert network.read(d) is True
+
+    with pytest.raises(AssertionError):
+        network.add_links([c], [a])
+    with pytest.raises(AssertionError):
+        network.add_gates([core.NOR], cookies=[])
+
+
+def test_add_gate_reuses_values():
+    network = core.Network()
+    indexes = [network.add_gate(core.NOR) for i in range(3)]
+    for i in range(10):
+        network.remove_gate(indexes[1])
+        assert network.add_gate(core.SWITCH) == indexes[1]
+        assert network.read(indexes[1]) is False
+        network.remove_gate(indexes[1])
+        network.add_gate(core.NOR)
+    assert len(network._values) == 3
+
+
+def test_compact():
+    network = core.Network()
+    a, b, c, d, e = [network.add_gate(core.SWITCH if i == 0 else core.NOR) for i in range(5)]
+    network.add_link(a, c)
+    network.add_link(c, e)
+    network.add_link(a, e)
+    network.watch(e, 'e', False)
+    network.remove_gate(b)
+    network.remove_gate(d)
+    network.drain()
+    assert network.compact() == {a: 0, c: 1, e: 2}
+    assert network.get_size() == 3
+    assert network.get_inputs(1) == [0]
+    assert network.get_inputs(2) == [1, 0]
+    assert network._watches == [('e', 2, False)]
+    assert network.compact() == {0: 0, 1: 1, 2: 2}
+    assert network.add_gate(core.NOR) == 3
+
+    network.write(0, True)
+    network.drain()
+    assert [network.read(i) for i in range(3)] == [True, False, False]
+
+
+def test_logger(caplog):
+    network = core.Network(logger=logging.getLogger('test'))
+    a, b = network.add_gates([core.SWITCH, core.NOR])
+    with caplog.at_level(logging.DEBUG, 'test'):
+        network.add_link(a, b)
+        network.remove_link(a, b)
+        network.add_links([a], [b])
+    assert caplog.messages == ['add link 0 1', 'remove link 0 1', 'add link 0 1']
+
+
+def test_freeze_stats():
+    network = core.Network()
+    a_idx = network.add_gate(core.SWITCH)
+    b_idx = network.add_gate(core.TIE)
+    idx = network.add_gate(core.NOR)
+    network.add_link(a_idx, idx)
+    network.add_link(b_idx, idx)
+    stats = network.get_stats()
+    network.freeze()
+    assert network.get_stats() == stats
+    assert network.get_size() == 3
+
+
+@pytest.mark.parametrize('engine', [core.EVENT, core.COUNTING, core.FRONTIER])
+@pytest.mark.parametrize('seed', range(5))
+def test_freeze_trace(seed, engine):
+    network, sources = random_network(seed)
+    expected = trace(network, sources, seed)
+    network, sources = random_network(seed)
+    network.freeze(engine)
+    assert trace(network, sources, seed) == expected
+
+
+def test_set_engine():
+    network, sources = random_network(0)
+    expected = trace(network, sources, 0, 100) + trace(network, sources, 1, 100)
+    network, sources = random_network(0)
+    network.freeze()
+    res = trace(network, sources, 0, 100)
+    network.set_engine(core.COUNTING)
+    res.extend(trace(network, sources, 1, 100))
+    assert res == expected
+
+
+def test_set_engine_unfrozen():
+    network = core.Network()
+    with pytest.raises(AssertionError):
+        network.set_engine(core.COUNTING)
+
+
+def test_parallel_network():
+    network = core.Network()
+    a_idx = network.add_gate(core.SWITCH)
+    b_idx = network.add_gate(core.SWITCH)
+    idx = network.add_gate(core.NOR)
+    not_idx = network.add_gate(core.NOR)
+    network.add_link(a_idx, idx)
+    network.add_link(b_idx, idx)
+    network.add_link(idx, not_idx)
+    network.freeze()
+
+    # every lane starts from the state of the source network
+    parallel = core.ParallelNetwork(network, 4)
+    assert parallel.read(idx) == 0b1111
+    assert parallel.read(not_idx) == 0b1111
+    assert parallel.drain() == 1
+    assert parallel.read(idx) == 0b1111
+    assert parallel.read(not_idx) == 0b0000
+
+    # all 4 combinations of inputs at once
+    parallel.write(a_idx, 0b1010)
+    parallel.write(b_idx, 0b1100)
+    parallel.drain()
+    assert parallel.read(idx) == 0b0001
+    assert parallel.read(not_idx) == 0b1110
+
+    # the source network is untouched
+    assert network.read(a_idx) is False
+    assert network.read(idx) is True
+
+
+@pytest.mark.parametrize('engine', [core.LEVELIZED, core.RANKED, core.SYNCHRONOUS, core.FRONTIER])
+@pytest.mark.parametrize('seed', range(5))
+def test_levelized(seed, engine):
+    network, sources = random_network(seed, loops=False)
+    reference, _ = random_network(seed, loops=False)
+    network.freeze(engine)
+    rand = random.Random(seed)
+    for i in range(20):
+        for source in sources:
+            value = rand.random() < 0.5
+            network.write(source, value)
+            reference.write(source, value)
+        steps = network.drain()
+        if engine in [core.LEVELIZED, core.RANKED]:
+            assert steps <= 1
+        reference.drain()
+        assert [network.read(index) for index in range(44)] == [reference.read(index) for index in range(44)]
+
+
+@pytest.mark.parametrize('engine', [core.LEVELIZED, core.RANKED, core.SYNCHRONOUS, core.FRONTIER])
+def test_levelized_latch(engine):
+    network = core.Network()
+    set_ = network.add_gate(core.SWITCH)
+    reset = network.add_gate(core.SWITCH)
+    q = network.add_gate(core.NOR)
+    q_ = network.add_gate(core.NOR)
+    network.add_link(reset, q)
+    network.add_link(q_, q)
+    network.add_link(set_, q_)
+    network.add_link(q, q_)
+    network.write(q, False)
+    network.freeze(engine)
+
+    network.drain()
+    assert network.read(q) is False
+    assert network.read(q_) is True
+
+    network.write(set_, True)
+    network.drain()
+    assert network.read(q) is True
+    assert network.read(q_) is False
+
+    network.write(set_, False)
+    network.drain()
+    assert network.read(q) is True
+
+    network.write(reset, True)
+    network.drain()
+    assert network.read(q) is False
+    assert network.read(q_) is True
+
+
+@pytest.mark.parametrize('engine', [core.LEVELIZED, core.RANKED, core.SYNCHRONOUS, core.FRONTIER])
+def test_levelized_oscillator(engine):
+    network = core.Network()
+    idx = network.add_gate(core.NOR)
+    network.add_link(idx, idx)
+    network.freeze(engine)
+    for i in range(5):
+        assert network.step() is True
+
+
+@pytest.mark.parametrize('engine,evaluations', [(core.EVENT, 4), (core.RANKED, 3)])
+def test_evaluations(engine, evaluations):
+    # a switch feeding both ends of a 3 gate chain, so in unit delay the last gate is evaluated twice
+    network = core.Network()
+    idx_0 = network.add_gate(core.SWITCH)
+    idx_1 = network.add_gate(core.NOR)
+    idx_2 = network.add_gate(core.NOR)
+    idx_3 = network.add_gate(core.NOR)
+    network.add_link(idx_0, idx_1)
+    network.add_link(idx_1, idx_2)
+    network.add_link(idx_2, idx_3)
+    network.add_link(idx_0, idx_3)
+    network.freeze(engine)
+    network.drain()
+    assert network.get_stats()['engine'] == engine
+    before = network.get_stats()['evaluations']
+
+    network.write(idx_0, True)
+    network.drain()
+    assert network.read(idx_3) is False
+    assert network.get_stats()['evaluations'] - before == evaluations
+
+
+def clocked_chain(engine):
+    """ a switch driving a chain of 3 nors """
+    network = core.Network()
+    clock = network.add_gate(core.SWITCH)
+    chain = [network.add_gate(core.NOR) for i in range(3)]
+    network.add_link(clock, chain[0])
+    network.add_link(chain[0], chain[1])
+    network.add_link(chain[1], chain[2])
+    if engine:
+        network.freeze(engine)
+    network.drain()
+    return network, clock, chain
+
+
+@pytest.mark.parametrize('engine', [None, core.EVENT, core.COUNTING])
+def test_run_cycles(engine):
+    network, clock, chain = clocked_chain(engine)
+    assert network.run_cycles(clock, 3) == [6, 6, 6]
+    assert network.read(clock) is False
+    assert network.read(chain[2]) is True
+
+
+@pytest.mark.parametrize('engine', [None, core.EVENT, core.COUNTING])
+def test_run_until(engine):
+    network, clock, chain = clocked_chain(engine)
+    # the end of the chain goes low while the clock is high
+    assert network.run_until(clock, chain[2], False, 5) == (1, [6])
+    assert network.read(chain[2]) is True
+    # while the middle is always high then
+    assert network.run_until(clock, chain[1], False, 3) == (None, [6, 6, 6])
+
+
+@pytest.mark.parametrize('engine', [core.EVENT, core.COUNTING, core.FRONTIER])
+def test_profiling(engine):
+    network, clock, chain = clocked_chain(engine)
+    network.set_profiling()
+    network.run_cycles(clock, 2)
+    profile = network.profile
+    assert profile.cycles == 2
+    # every gate of the chain is evaluated and toggles on each edge
+    assert [profile.evaluations[i] for i in chain] == [4, 4, 4]
+    assert [profile.toggles[i] for i in chain] == [4, 4, 4]
+    assert profile.evaluations[clock] == 0
+
+    network.set_profiling(False)
+    network.run_cycles(clock, 1)
+    assert network.profile is None
+
+
+@pytest.mark.parametrize('engine', [None, core.EVENT, core.COUNTING, core.LEVELIZED, core.SYNCHRONOUS])
+def test_changes_since(engine):
+    network, clock, chain = clocked_chain(engine)
+    first = network.subscribe()
+    second = network.subscribe()
+    assert network.changes_since(first) == []
+
+    network.write(clock, True)
+    network.drain()
+    assert network.changes_since(first) == [(clock, True), (chain[0], False), (chain[1], True), (chain[2], False)]
+    network.write(clock, False)
+    network.drain()
+    assert network.changes_since(first) == [(clock, False), (chain[0], True), (chain[1], False), (chain[2], True)]
+    # the second subscriber sees both, the gates that changed back included
+    assert network.changes_since(second) == [(clock, False), (chain[0], True), (chain[1], False), (chain[2], True)]
+
+    network.unsubscribe(second)
+    network.run_cycles(clock, 1)
+    assert len(network.changes_since(first)) == 4
+    with pytest.raises(KeyError):
+        network.changes_since(second)
+
+
+def test_changes_since_compact():
+    network = core.Network()
+    switches = [network.add_gate(core.SWITCH) for i in range(5)]
+    not_ = network.add_gate(core.NOR, inputs=[switches[-1]])
+    network.drain()
+    token = network.subscribe()
+    for switch in switches:
+        network.write(switch, True)
+    network.drain()
+    network.remove_link(switches[-1], not_)
+    for switch in switches:
+        network.remove_gate(switch)
+    network.compact()
+    assert network.changes_since(token) == [(0, False)]
+
+
+@pytest.mark.parametrize('engine', [None, core.EVENT, core.COUNTING, core.LEVELIZED, core.RANKED])
+def test_rich_gates(engine):
+    network = core.Network(rich_primitives=True)
+    a, b, c = [network.add_gate(core.SWITCH) for i in range(3)]
+    gates = {
+        type_: network.add_gate(type_, inputs=[a, b, c]) for type_ in [core.NOR, core.AND, core.OR, core.XOR, core.NAND]
+    }
+    gates[core.NOT] = network.add_gate(core.NOT, inputs=[a])
+    gates[core.BUF] = network.add_gate(core.BUF, inputs=[a])
+    # a chain of them, to check they can feed each other
+    last = network.add_gate(core.NOT, inputs=[network.add_gate(core.XOR, inputs=[gates[core.AND], gates[core.OR]])])
+    if engine:
+        network.freeze(engine)
+
+    for inputs in range(8):
+        bits = [bool(inputs >> i & 1) for i in range(3)]
+        for index, value in zip([a, b, c], bits):
+            network.write(index, value)
+        network.drain()
+        assert {type_: network.read(index) for type_, index in gates.items()} == {
+            core.NOR: not any(bits),
+            core.AND: all(bits),
+            core.OR: any(bits),
+            core.XOR: sum(bits) % 2 == 1,
+            core.NAND: not all(bits),
+            core.NOT: not bits[0],
+            core.BUF: bits[0],
+        }
+        assert network.read(last) == (all(bits) == any(bits))
+
+
+def test_rich_gates_option():
+    network = core.Network()
+    with pytest.raises(AssertionError):
+        network.add_gate(core.AND)
+    network = core.Network(rich_primitives=True)
+    # their values with no inputs follow from the counts
+    values = [network.read(network.add_gate(type_)) for type_ in core.RICH_TYPES]
+    assert values == [True, False, False, True, False, False]
+    assert network.has_rich_gates()
+    network.freeze()
+    for engine in [core.SYNCHRONOUS, core.FRONTIER]:
+        with pytest.raises(AssertionError):
+            network.set_engine(engine)
+
+
+def dff_counter(bits):
+    """ a ripple counter of dffs, each one toggles when the one before it goes low """
+    network = core.Network()
+    clock = network.add_gate(core.SWITCH)
+    dffs = []
+    for i in range(bits):
+        dff = network.add_gate(core.DFF)
+        network.add_links([dffs[-1] if dffs else clock, network.add_gate(core.NOR, inputs=[dff])], [dff, dff])
+        dffs.append(dff)
+    return network, clock, dffs
+
+
+@pytest.mark.parametrize('engine', [None, core.EVENT, core.COUNTING, core.LEVELIZED, core.RANKED])
+def test_dff(engine):
+    network, clock, dffs = dff_counter(3)
+    if engine:
+        network.freeze(engine)
+    network.drain()
+    for cycle in range(1, 10):
+        network.run_cycles(clock, 1)
+        assert sum(network.read(dff) << i for i, dff in enumerate(dffs)) == cycle % 8
+
+
+def test_dff_data_while_clock_high():
+    network = core.Network()
+    clock, data = [network.add_gate(core.SWITCH) for i in range(2)]
+    dff = network.add_gate(core.DFF, inputs=[clock, data])
+    network.drain()
+    network.write(clock, True)
+    for value in [True, False, True]:
+        network.write(data, value)
+        network.drain()
+        assert not network.read(dff)
+    network.write(clock, False)
+    network.write(data, False)
+    network.drain()
+    assert network.read(dff)
+
+
+def test_dff_option():
+    network, clock, dffs = dff_counter(2)
+    assert network.has_rich_gates()
+    network.freeze()
+    for engine in [core.SYNCHRONOUS, core.FRONTIER]:
+        with pytest.raises(AssertionError):
+            network.set_engine(engine)
+
+    network = core.Network()
+    network.add_gate(core.DFF, inputs=[network.add_gate(core.SWITCH)])
+    with pytest.raises(AssertionError):
+        network.freeze()
+
+
+@pytest.mark.parametrize('engine', [None, core.COUNTING])
+def test_dff_state(engine, tmp_path):
+    network, clock, dffs = dff_counter(3)
+    if engine:
+        network.freeze(engine)
+    network.run_cycles(clock, 3)
+    # mid cycle, with the dffs having taken in data they haven't passed out yet
+    network.write(clock, True)
+    network.drain()
+    snapshot = network.snapshot()
+    network.save_state(tmp_path / 'state')
+
+    for restore in [lambda: network.restore(snapshot), lambda: network.load_state(tmp_path / 'state')]:
+        network.run_cycles(clock, 2)
+        restore()
+        network.write(clock, False)
+        network.drain()
+        assert [network.read(dff) for dff in dffs] == [False, False, True]
+
+
+def test_dff_netlist(tmp_path):
+    network, clock, dffs = dff_counter(3)
+    network.freeze()
+    network.write(clock, True)
+    network.drain()
+    network.save_netlist(tmp_path / 'netlist')
+    loaded, names = core.Network.load_netlist(tmp_path / 'netlist')
+    loaded.write(clock, False)
+    loaded.drain()
+    assert [loaded.read(dff) for dff in dffs] == [True, False, False]
+
+
+def test_dff_parallel():
+    network, clock, dffs = dff_counter(2)
+    network.freeze()
+    network.drain()
+    parallel = core.ParallelNetwork(network, 2)
+    # lane 0 is clocked twice and lane 1 once
+    for clocks in [0b11, 0b00, 0b01, 0b00]:
+        parallel.write(clock, clocks)
+        parallel.drain()
+    assert [parallel.read(dff) for dff in dffs] == [0b10, 0b01]
+
+
+@pytest.mark.parametrize('engine', [None, core.EVENT, core.COUNTING, core.RANKED])
+def test_drain_oscillation(engine):
+    # a switch gating a ring of 3 nors, which oscillates once the switch goes low
+    network = core.Network()
+    enable = network.add_gate(core.SWITCH)
+    ring = [network.add_gate(core.NOR) for i in range(3)]
+    bystander = network.add_gate(core.NOR)
+    network.add_link(enable, ring[0])
+    for i in range(3):
+        network.add_link(ring[i], ring[(i + 1) % 3])
+    if engine:
+        network.freeze(engine)
+    network.write(enable, True)
+    network.drain()
+
+    network.write(enable, False)
+    with pytest.raises(core.OscillationError) as e:
+        network.drain()
+    assert e.value.gates <= set(ring)
+    assert bystander not in e.value.gates
+
+
+def test_drain_max_steps():
+    network, clock, chain = clocked_chain(None)
+    network.write(clock, True)
+    with pytest.raises(core.OscillationError) as e:
+        network.drain(max_steps=2)
+    assert e.value.gates == {chain[2]}
+
+
+@pytest.mark.parametrize('engine', [None, core.EVENT, core.COUNTING])
+def test_run_cycles_oscillation(engine):
+    network, clock, chain = clocked_chain(engine)
+    with pytest.raises(core.OscillationError):
+        network.run_cycles(clock, 1, max_steps=2)
+
+    # a ring of 3 nors that oscillates once the clock goes low
+    network = core.Network()
+    clock = network.add_gate(core.SWITCH)
+    ring = [network.add_gate(core.NOR) for i in range(3)]
+    network.add_link(clock, ring[0])
+    for i in range(3):
+        network.add_link(ring[i], ring[(i + 1) % 3])
+    if engine:
+        network.freeze(engine)
+    network.write(clock, True)
+    network.drain()
+    with pytest.raises(core.OscillationError) as e:
+        network.run_until(clock, ring[0], True, 10)
+    assert e.value.gates <= set(ring)
+
+
+def test_drain_long_chain():
+    # settling longer than the window isn't an oscillation
+    network = core.Network()
+    source = network.add_gate(core.SWITCH)
+    for i in range(200):
+        gate = network.add_gate(core.NOR)
+        network.add_link(source, gate)
+        source = gate
+    network.drain()
+    network.write(0, True)
+    assert network.drain() == 200
+
+
+@pytest.mark.parametrize('engine', [None, core.EVENT, core.COUNTING, core.FRONTIER])
+def test_snapshot(engine):
+    network, sources = random_network(5)
+    if engine:
+        network.freeze(engine)
+    trace(network, sources, 1, steps=20)
+    snapshot = network.snapshot()
+    expected = trace(network, sources, 2)
+
+    trace(network, sources, 3, steps=50)
+    network.restore(snapshot)
+    assert trace(network, sources, 2) == expected
+
+
+@pytest.mark.parametrize('engine', [None, core.EVENT, core.COUNTING])
+def test_save_state(engine, tmp_path):
+    network, sources = random_network(6)
+    if engine:
+        network.freeze(engine)
+    trace(network, sources, 1, steps=20)
+    network.save_state(tmp_path / 'state')
+    expected = trace(network, sources, 2)
+
+    trace(network, sources, 3, steps=50)
+    network.load_state(tmp_path / 'state')
+    assert trace(network, sources, 2) == expected
+
+
+@pytest.mark.parametrize('engine', [
+    core.EVENT, core.COUNTING, core.LEVELIZED, core.RANKED, core.SYNCHRONOUS, core.FRONTIER,
+])
+def test_netlist(engine, tmp_path):
+    network, sources = random_network(7, loops=False)
+    network.watch(sources[0], 'first', False)
+    network.freeze()
+    network.save_netlist(tmp_path / 'netlist', {'a': sources[0], 'b': sources[1]})
+    network.set_engine(engine)
+    expected = trace(network, sources, 1)
+
+    loaded, names = core.Network.load_netlist(tmp_path / 'netlist', engine)
+    assert names == {'a': sources[0], 'b': sources[1]}
+    assert loaded._watches == [('first', sources[0], False)]
+    assert loaded.get_stats()['engine'] == engine
+    assert trace(loaded, sources, 1) == expected
+
+
+@pytest.mark.parametrize('engine', [None, core.EVENT, core.COUNTING])
+def test_macro(engine):
+    network = core.Network()
+    a = network.add_gate(core.SWITCH)
+    b = network.add_gate(core.SWITCH)
+    xor = network.add_gate(core.MACRO)
+    out = network.add_gate(core.NOR)
+    network.add_link(xor, out)
+    network.add_macro([a, b], [xor], lambda values: [values[0] != values[1]])
+    if engine:
+        network.freeze(engine)
+    network.drain()
+    assert network.read(out) is True
+
+    network.write(a, True)
+    assert network.drain() == 2
+    assert network.read(xor) is True
+    assert network.read(out) is False
+    network.write(b, True)
+    network.drain()
+    assert network.read(out) is True
+
+
+@pytest.mark.parametrize('engine', [None, core.EVENT, core.COUNTING, core.LEVELIZED, core.RANKED])
+def test_macro_triggers(engine):
+    network = core.Network()
+    a, b = [network.add_gate(core.SWITCH) for i in range(2)]
+    not_a = network.add_gate(core.NOR, inputs=[a])
+    network.add_gate(core.NOR, inputs=[b])
+    out = network.add_gate(core.MACRO)
+    calls = []
+
+    def function(values):
+        calls.append(values)
+        return [values[0]]
+    network.add_macro([not_a], [out], function)
+    if engine:
+        network.freeze(engine)
+    network.drain()
+    assert calls == [[True]]
+    assert network.read(out) is True
+
+    # nothing to do, so no steps and no evaluations
+    assert network.drain() == 0
+    # a gate that isn't an input toggling doesn't evaluate it
+    network.write(b, True)
+    network.drain()
+    assert calls == [[True]]
+    # an input toggling does, once
+    network.write(a, True)
+    network.drain()
+    assert calls == [[True], [False]]
+    assert network.read(out) is False
+    # as does writing an input directly
+    network.write(not_a, True)
+    network.drain()
+    assert calls[2] == [True]
@@ -1,5 +1,7 @@
-from gatesym import core, gates
-from gatesym.blocks import adders
+import pytest
+
+from gatesym import core, gates, test_utils, utils
+from gatesym.blocks import adders, latches, multipliers
 
 
 def test_find():
@@ -37,3 +39,253 @@ def test_list():
     assert a.list('full_adder(0.half_adder(0.nor.nor.1).nor') == ['nor']
     assert a.list('full_adder(0.half_adder(0.nor.nor.1).nor.nor') == ['1)']
     assert a.list('full_adder(0.half_adder(0.nor.nor.1).nor.nor.1)') == []
+
+
+def test_structural_hashing():
+    n = core.Network(structural_hashing=True)
+    a = gates.Switch(n)
+    b = gates.Switch(n)
+    c = gates.Nor(a, b)
+    d = gates.Nor(b, a)
+    e = gates.Not(a)
+    assert c is not d
+    assert c.index == d.index
+    assert gates.Not(a).index == e.index
+    assert n.get_size() == 4
+
+    # behind placeholders are loops under construction, they're never shared
+    p = gates.Placeholder(n)
+    f = gates.Nor(p, a)
+    g = gates.Nor(p, a)
+    assert f.index != g.index
+    p.replace(b)
+    assert gates.Nor(p, a).index == c.index
+
+
+def test_structural_hashing_off():
+    n = core.Network()
+    a = gates.Switch(n)
+    assert gates.Not(a).index != gates.Not(a).index
+
+
+def test_structural_hashing_latches():
+    n = core.Network(structural_hashing=True)
+    clock = gates.Switch(n)
+    data = gates.Switch(n)
+    # two flops on the same data share their input logic but not their state
+    stored = latches.register([data, data], clock)
+    assert stored[0].index != stored[1].index
+    data.write(True)
+    n.drain()
+    clock.write(True)
+    n.drain()
+    clock.write(False)
+    n.drain()
+    assert stored[0].read() and stored[1].read()
+
+
+def test_behavioral():
+    n = core.Network()
+    a = test_utils.BinaryIn(n, 8)
+    b = test_utils.BinaryIn(n, 8)
+    r, c = adders.ripple_adder(a, b)
+    block = c.block
+    r = test_utils.BinaryOut(r)
+
+    for behavioral in [True, False, True]:
+        block.set_behavioral(behavioral)
+        assert block.behavioral == behavioral
+        for v1, v2 in [(3, 4), (200, 100), (255, 1)]:
+            a.write(v1)
+            b.write(v2)
+            n.drain()
+            assert r.read() == (v1 + v2) % 256
+            assert c.read() == (v1 + v2 >= 256)
+
+
+def test_behavioral_blocks():
+    # every instance of a listed block is built behavioral, nested ones give way to the outermost
+    n = core.Network()
+    n.behavioral_blocks.update(['ripple_adder', 'ripple_multiplier'])
+    a = test_utils.BinaryIn(n, 8)
+    b = test_utils.BinaryIn(n, 8)
+    r, c = multipliers.ripple_multiplier(a, b)
+    assert c.block.behavioral
+    assert n.get_stats()['gates_by_type']['macro'] == 9
+    r = test_utils.BinaryOut(r)
+
+    a.write(20)
+    b.write(30)
+    n.drain()
+    assert r.read() == 600 % 256
+    assert c.read()
+    assert len(n._macros) == 1
+
+
+@pytest.mark.parametrize('option', ['behavioral', 'memoized'])
+def test_blocks_with_placeholder_inputs(option):
+    # instances with an input behind a placeholder are swapped once it's replaced, before the network is run
+    n = core.Network()
+    if option == 'behavioral':
+        n.behavioral_blocks.add('ripple_incr')
+    else:
+        n.memoized_blocks['ripple_incr'] = 16
+    word = utils.PlaceholderWord(n, 4)
+    r, c = adders.ripple_incr(word)
+    # and ones that never get connected are left as gates
+    unconnected = adders.ripple_incr(utils.PlaceholderWord(n, 4))[1]
+    assert not getattr(c.block, option)
+    a = test_utils.BinaryIn(n, 4)
+    word.replace(a)
+    r = test_utils.BinaryOut(r)
+
+    a.write(9)
+    n.drain()
+    assert getattr(c.block, option)
+    assert not getattr(unconnected.block, option)
+    assert r.read() == 10
+    a.write(15)
+    n.drain()
+    assert r.read() == 0
+    assert c.read()
+
+
+def test_memoized():
+    n = core.Network()
+    a = test_utils.BinaryIn(n, 8)
+    b = test_utils.BinaryIn(n, 8)
+    r, c = adders.ripple_adder(a, b)
+    block = c.block
+    r = test_utils.BinaryOut(r)
+
+    block.set_memoized(2)
+    assert block.memoized and not block.behavioral
+    for v1, v2 in [(3, 4), (200, 100), (3, 4), (255, 1), (200, 100)]:
+        a.write(v1)
+        b.write(v2)
+        n.drain()
+        assert r.read() == (v1 + v2) % 256
+        assert c.read() == (v1 + v2 >= 256)
+    # (3, 4) is the only repeat still in the cache when it comes around again
+    assert block.memo.get_stats() == {'size': 2, 'entries': 2, 'hits': 1, 'misses': 4, 'evictions': 2}
+
+    block.set_memoized(0)
+    assert not block.memoized
+    a.write(100)
+    n.drain()
+    assert r.read() == 200
+
+
+def test_memoized_blocks():
+    n = core.Network()
+    n.memoized_blocks['ripple_multiplier'] = 16
+    a = test_utils.BinaryIn(n, 4)
+    b = test_utils.BinaryIn(n, 4)
+    r, c = multipliers.ripple_multiplier(a, b)
+    assert c.block.memoized
+    r = test_utils.BinaryOut(r)
+    for v1, v2 in [(5, 3), (15, 15), (5, 3)]:
+        a.write(v1)
+        b.write(v2)
+        n.drain()
+        assert r.read() == v1 * v2 % 16
+    assert c.block.memo.hits == 1
+
+
+def descendants(block):
+    for child in block.children:
+        yield child
+        yield from descendants(child)
+
+
+def test_memoized_behavioral_child():
+    n = core.Network()
+    n.behavioral_blocks.add('ripple_adder')
+    a = test_utils.BinaryIn(n, 4)
+    b = test_utils.BinaryIn(n, 4)
+    r, c = multipliers.ripple_multiplier(a, b)
+    assert any(child.behavioral for child in descendants(c.block))
+    c.block.set_memoized(8)
+    assert not any(child.behavioral for child in descendants(c.block))
+    r = test_utils.BinaryOut(r)
+    for v1 in range(16):
+        for v2 in range(16):
+            a.write(v1)
+            b.write(v2)
+            n.drain()
+            assert r.read() == v1 * v2 % 16
+
+
+def test_swap_frozen():
+    n = core.Network()
+    a = test_utils.BinaryIn(n, 4)
+    b = test_utils.BinaryIn(n, 4)
+    r, c = adders.ripple_adder(a, b)
+    n.freeze()
+    with pytest.raises(AssertionError, match='frozen'):
+        c.block.set_behavioral()
+    with pytest.raises(AssertionError, match='frozen'):
+        c.block.set_memoized()
+
+
+def test_memoized_not_combinational():
+    n = core.Network()
+    d = gates.Switch(n)
+    clock = gates.Switch(n)
+    q, q_ = latches.gated_d_latch(d, clock)
+    with pytest.raises(AssertionError):
+        q.block.set_memoized()
+
+
+def test_compact():
+    n = core.Network()
+    spare = [gates.Switch(n) for i in range(3)]
+    a = test_utils.BinaryIn(n, 4)
+    b = test_utils.BinaryIn(n, 4)
+    r, c = adders.ripple_adder(a, b)
+    block = c.block
+    block.set_behavioral()
+    for switch in spare:
+        n.remove_gate(switch.index)
+    mapping = n.compact()
+    assert len(mapping) == n.get_size()
+    assert block.start == 8
+    assert block.start + block.size == n.get_size()
+    assert all(block.start <= child.start for child in block.children)
+
+    r = test_utils.BinaryOut(r)
+    a.write(9)
+    b.write(10)
+    n.drain()
+    assert r.read() == 3
+    assert c.read()
+    block.set_behavioral(False)
+    a.write(1)
+    n.drain()
+    assert r.read() == 11
+    assert not c.read()
+
+
+@pytest.mark.parametrize('rich', [False, True])
+def test_rich_primitives(rich):
+    n = core.Network(rich_primitives=rich)
+    a = gates.Switch(n)
+    b = gates.Switch(n)
+    functions = {
+        gates.And: lambda x, y: x and y,
+        gates.Or: lambda x, y: x or y,
+        gates.Nand: lambda x, y: not (x and y),
+        gates.Xor: lambda x, y: x != y,
+    }
+    outputs = {function: function(a, b) for function in functions}
+    not_a = gates.Not(a)
+    # one gate each with rich primitives
+    assert (n.get_size() == 2 + 5) == rich
+    for x in [False, True]:
+        for y in [False, True]:
+            a.write(x)
+            b.write(y)
+            n.drain()
+            assert not_a.read() == (not x)
+            for function, output in outputs.items():
+                assert output.read() == functions[function](x, y)
@@ -0,0 +1,98 @@
+import random
+
+from gatesym import core, gates, optimizer, test_utils
+from gatesym.blocks import adders, latches, multipliers
+
+
+def test_double_inversion():
+    network = core.Network()
+    a = gates.Switch(network)
+    b = gates.Not(gates.Not(a))
+    c = gates.Not(b)
+    counts = optimizer.optimize(network, [c])
+    assert counts.double_inversions == 1
+    assert b.index == a.index
+    assert network._gates[c.index].inputs == [a.index]
+
+    a.write(True)
+    network.drain()
+    assert b.read()
+    assert not c.read()
+
+
+def test_constants():
+    network = core.Network()
+    a = gates.Switch(network)
+    high = gates.Tie(network, True)
+    low = gates.Tie(network, False)
+    forced_low = gates.Nor(a, high)
+    passed = gates.Nor(a, low)
+    counts = optimizer.optimize(network, [forced_low, passed])
+    assert counts.constants == 1
+    assert forced_low.index == low.index
+    assert network._gates[passed.index].inputs == [a.index]
+
+
+def test_merge():
+    network = core.Network()
+    a = gates.Switch(network)
+    b = gates.Switch(network)
+    c = gates.Nor(a, b)
+    d = gates.Nor(b, a)
+    counts = optimizer.optimize(network, [c, d])
+    assert counts.merged == 1
+    assert c.index == d.index
+
+
+def test_dead():
+    network = core.Network()
+    a = gates.Switch(network)
+    kept = gates.Nor(a)
+    unused = gates.Nor(gates.Nor(a, a))
+    counts = optimizer.optimize(network, [kept])
+    assert counts.dead == 2
+    assert network._gates[unused.index] is None
+    assert optimizer.count_gates(network) == 2
+
+
+def test_adder():
+    network = core.Network()
+    a = test_utils.BinaryIn(network, 8)
+    b = test_utils.BinaryIn(network, 8)
+    r, c = adders.ripple_adder(a, b)
+    before = optimizer.count_gates(network)
+    optimizer.optimize(network, r + [c])
+    assert optimizer.count_gates(network) < before
+    r = test_utils.BinaryOut(r)
+
+    for i in range(20):
+        v1 = random.randrange(256)
+        v2 = random.randrange(256)
+        a.write(v1)
+        b.write(v2)
+        network.drain()
+        assert r.read() == (v1 + v2) % 256
+        assert c.read() == (v1 + v2 >= 256)
+
+
+def test_multiplier_register():
+    network = core.Network()
+    clock = gates.Switch(network)
+    a = test_utils.BinaryIn(network, 8)
+    b = test_utils.BinaryIn(network, 8)
+    r, c = multipliers.ripple_multiplier(a, b)
+    stored = latches.register(r, clock)
+    optimizer.optimize(network, stored)
+    stored = test_utils.BinaryOut(stored)
+
+    for i in range(10):
+        v1 = random.randrange(256)
+        v2 = random.randrange(256)
+        a.write(v1)
+        b.write(v2)
+        network.drain()
+        clock.write(True)
+        network.drain()
+        clock.write(False)
+        network.drain()
+        assert stored.read() == v1 * v2 % 256
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from gatesym import core, partitioned, test_utils
+from gatesym.blocks import adders, latches
+from gatesym.tests.test_core import random_network
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('processes', [2, 3])
+def test_random_network(seed, processes):
+    # without loops a network settles to the same values however the work is split up
+    network, sources = random_network(seed, nors=200, links=400, loops=False)
+    network.freeze()
+    reference, _ = random_network(seed, nors=200, links=400, loops=False)
+    reference.freeze()
+    rand = random.Random(seed)
+
+    with partitioned.PartitionedNetwork(network, processes) as split:
+        assert split.get_stats()['cut'] > 0
+        for i in range(10):
+            for source in sources:
+                value = rand.random() < 0.5
+                split.write(source, value)
+                reference.write(source, value)
+            split.drain()
+            reference.drain()
+            assert [split.read(index) for index in range(network.get_size())] == [
+                reference.read(index) for index in range(reference.get_size())
+            ]
+
+
+def test_adder_and_register():
+    network = core.Network()
+    clock = test_utils.BinaryIn(network, 1)
+    a = test_utils.BinaryIn(network, 8)
+    b = test_utils.BinaryIn(network, 8)
+    r, c = adders.ripple_adder(a, b)
+    stored = test_utils.BinaryOut(latches.register(r, clock[0]))
+    network.freeze()
+
+    with partitioned.PartitionedNetwork(network, 3) as split:
+        split.drain()
+        for i in range(10):
+            v1 = random.randrange(256)
+            v2 = random.randrange(256)
+            for bit in range(8):
+                split.write(a[bit].index, v1 >> bit & 1)
+                split.write(b[bit].index, v2 >> bit & 1)
+            split.write(clock[0].index, True)
+            split.drain()
+            split.write(clock[0].index, False)
+            split.drain()
+            assert sum(split.read(gate.index) << bit for bit, gate in enumerate(stored.gates)) == (v1 + v2) % 256
+
+
+def test_loaded_netlist(tmp_path):
+    network, sources = random_network(4, nors=100, links=200, loops=False)
+    network.freeze()
+    network.drain()
+    network.save_netlist(tmp_path / 'netlist')
+    loaded, names = core.Network.load_netlist(tmp_path / 'netlist')
+
+    with partitioned.PartitionedNetwork(loaded, 2) as split:
+        split.write(sources[0], True)
+        network.write(sources[0], True)
+        split.drain()
+        network.drain()
+        assert [split.read(index) for index in range(network.get_size())] == [
+            network.read(index) for index in range(network.get_size())
+        ]
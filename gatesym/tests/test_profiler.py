@@ -0,0 +1,42 @@
+import io
+import json
+
+from gatesym import core, profiler, test_utils
+from gatesym.blocks import adders
+from gatesym.gates import Switch
+
+
+def test_report():
+    network = core.Network()
+    clock = Switch(network)
+    a = test_utils.BinaryIn(network, 4)
+    b = test_utils.BinaryIn(network, 4)
+    r, c = adders.ripple_adder(a, b)
+    network.freeze()
+    network.drain()
+    network.set_profiling()
+    a.write(7)
+    b.write(9)
+    network.run_cycles(clock.index, 2)
+
+    rows = {row.path: row for row in profiler.report(network)}
+    adder = rows['ripple_adder']
+    assert adder.instances == 1
+    assert adder.gates == r[0].block.size
+    assert adder.evaluations == sum(network.profile.evaluations)
+    assert adder.evaluations_per_cycle == adder.evaluations / 2
+    full_adders = rows['ripple_adder/full_adder']
+    assert full_adders.instances == 3
+    half_adders = rows['ripple_adder/full_adder/half_adder']
+    assert half_adders.instances == 6
+    # a full adder is two half adders and an or
+    assert full_adders.self_evaluations == full_adders.evaluations - half_adders.evaluations
+    # the switches aren't in any block
+    assert rows[profiler.OUTSIDE].gates == 9
+    assert profiler.format_report(profiler.report(network)).count('\n') == len(rows)
+
+    f = io.StringIO()
+    profiler.dump_json(network, f)
+    res = json.loads(f.getvalue())
+    assert res['cycles'] == 2
+    assert res['blocks'][0]['path'] == 'ripple_adder'
@@ -0,0 +1,27 @@
+from array import array
+
+import pytest
+
+from gatesym import storage
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'file'
+    storage.write(path, b'TEST', 3, [
+        ('bytes', 'B', b'abc'),
+        ('ints', 'i', array('i', [1, -2, 3])),
+        ('empty', 'i', array('i')),
+    ])
+    sections = storage.read(path, b'TEST', 3)
+    assert bytes(sections['bytes']) == b'abc'
+    assert sections['ints'].tolist() == [1, -2, 3]
+    assert sections['empty'].tolist() == []
+
+
+def test_bad_files(tmp_path):
+    path = tmp_path / 'file'
+    storage.write(path, b'TEST', 3, [])
+    with pytest.raises(ValueError):
+        storage.read(path, b'ELSE', 3)
+    with pytest.raises(ValueError):
+        storage.read(path, b'TEST', 4)
@@ -0,0 +1,92 @@
+import pytest
+
+from gatesym import core, vcd
+from gatesym.gates import Nor, Switch
+from gatesym.modules.cpu_core import cpu_core
+from gatesym.test_utils import BinaryIn, BinaryOut
+
+
+def parse(path):
+    """ the signal names, and the (time, name, value) changes after the initial values """
+    names = {}
+    changes = []
+    time = None
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('$var'):
+                _, _, _, code, name, _ = line.split()
+                names[code] = name
+            elif line.startswith('#'):
+                time = int(line[1:])
+            elif line and line[0] in '01':
+                changes.append((time, names[line[1:]], int(line[0])))
+    return names, changes
+
+
+def test_vcd(tmp_path):
+    network = core.Network()
+    clock = Switch(network)
+    a = BinaryIn(network, 2)
+    r = BinaryOut([Nor(clock, a[0]), Nor(Nor(clock, a[1]))])
+    clock.watch('clock')
+    a.watch('a')
+    r.watch('r')
+    network.freeze()
+    network.drain()
+
+    path = tmp_path / 'trace.vcd'
+    with vcd.VCDWriter(network, path, cycle_length=10):
+        a.write(2)
+        network.drain()
+        network.run_cycles(clock.index, 2)
+    assert network.trace is None
+
+    names, changes = parse(path)
+    assert sorted(names.values()) == ['a_0', 'a_1', 'clock', 'r_0', 'r_1']
+    assert changes == [
+        # the initial values
+        (0, 'clock', 0), (0, 'a_0', 0), (0, 'a_1', 0), (0, 'r_0', 1), (0, 'r_1', 0),
+        # a written and settled before the first cycle
+        (1, 'a_1', 1),
+        (2, 'r_1', 1),
+        # each cycle the clock goes high and r_0 follows it in the first step, then the same going low
+        (10, 'clock', 1), (10, 'r_0', 0), (11, 'clock', 0), (11, 'r_0', 1),
+        (20, 'clock', 1), (20, 'r_0', 0), (21, 'clock', 0), (21, 'r_0', 1),
+    ]
+
+
+def test_vcd_compact(tmp_path):
+    network = core.Network()
+    clock = Switch(network)
+    spare = Switch(network)
+    r = Nor(clock)
+    clock.watch('clock')
+    r.watch('r')
+    network.drain()
+
+    path = tmp_path / 'trace.vcd'
+    with vcd.VCDWriter(network, path, cycle_length=10):
+        network.remove_gate(spare.index)
+        network.compact()
+        network.run_cycles(clock.index, 1)
+    names, changes = parse(path)
+    assert changes == [(0, 'clock', 0), (0, 'r', 1), (10, 'clock', 1), (10, 'r', 0), (11, 'clock', 0), (11, 'r', 1)]
+
+
+def test_vcd_cpu_core(tmp_path):
+    network = core.Network()
+    clock = Switch(network)
+    cpu_core(clock, BinaryIn(network, 8), BinaryIn(network, 8), Switch(network), debug=True)
+    network.drain()
+    path = tmp_path / 'trace.vcd'
+    with vcd.VCDWriter(network, path):
+        network.run_cycles(clock.index, 4)
+    names, changes = parse(path)
+    assert 'clock_pc' in names.values()
+    # the state machine steps through a state each cycle
+    assert {name for time, name, value in changes if time >= 1000} >= {'clock', 's1', 's2', 's3'}
+
+    with pytest.raises(AssertionError):
+        with vcd.VCDWriter(network, path):
+            network.watch(clock.index, 'late', False)
@@ -0,0 +1,98 @@
+"""
+stream the watched gates of a network (see Network.watch) to a value change dump file for viewing in a waveform tool
+
+only changes are written, as they happen, so memory use doesn't grow with the length of the run
+time is counted in steps, each clock cycle starts at a multiple of cycle_length so cycle and step can be read off it
+the values at a time are those after that step, so a gate written directly shows up along with the step that follows
+"""
+
+import re
+
+DEFAULT_CYCLE_LENGTH = 1000
+_BUFFER_SIZE = 1 << 16
+
+
+def _identifier(i):
+    """ the short code for the i'th signal, vcd uses strings of the printable ascii characters """
+    res = ''
+    while True:
+        i, digit = divmod(i, 94)
+        res += chr(33 + digit)
+        if not i:
+            return res
+        i -= 1
+
+
+class VCDWriter(object):
+    """
+    write the watched gates of a network to path, from now until it's closed, as the network is stepped
+
+    run_cycles and run_until start a new cycle each time they clock the network, otherwise call next_cycle
+    use it as a context manager or call close to detach it from the network and finish the file
+    """
+
+    def __init__(self, network, path, cycle_length=DEFAULT_CYCLE_LENGTH, timescale='1ns'):
+        assert network.trace is None
+        self.network = network
+        self.cycle_length = cycle_length
+        self.cycle = 0
+        self.step = 0
+        self._gates = [index for name, index, negate in network._watches]
+        self._negate = [negate for name, index, negate in network._watches]
+        self._codes = [_identifier(i) for i in range(len(self._gates))]
+        self._last = None
+        self._time = None
+        self._file = open(path, 'w', buffering=_BUFFER_SIZE)
+
+        self._file.write(f'$timescale {timescale} $end\n$scope module gatesym $end\n')
+        for (name, index, negate), code in zip(network._watches, self._codes):
+            name = re.sub(r'\s+', '_', name)  # names can't have spaces in them
+            self._file.write(f'$var wire 1 {code} {name} $end\n')
+        self._file.write('$upscope $end\n$enddefinitions $end\n')
+        network.trace = self
+        self.sample()
+
+    def _values(self):
+        values = self.network._values
+        return [bool(values[index]) != negate for index, negate in zip(self._gates, self._negate)]
+
+    def sample(self):
+        """ write out any changes since the last sample, this is called after every step of the network """
+        values = self._values()
+        last = self._last
+        if last is None:
+            self._file.write('#0\n$dumpvars\n')
+            self._file.writelines(f'{int(value)}{code}\n' for value, code in zip(values, self._codes))
+            self._file.write('$end\n')
+            self._time = 0
+        elif values != last:
+            time = self.cycle * self.cycle_length + min(self.step, self.cycle_length - 1)
+            if time != self._time:
+                self._file.write(f'#{time}\n')
+                self._time = time
+            self._file.writelines(
+                f'{int(value)}{code}\n' for value, old, code in zip(values, last, self._codes) if value != old
+            )
+        self._last = values
+        self.step += 1
+
+    def renumber(self, mapping):
+        """ follow the network being compacted, see Network.compact """
+        self._gates = [mapping[index] for index in self._gates]
+
+    def next_cycle(self):
+        self.cycle += 1
+        self.step = 0
+
+    def close(self):
+        if self._file is None:
+            return
+        self.network.trace = None
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
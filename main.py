@@ -79,6 +79,13 @@ FACES = [
 
 UNCONNECTED = -1
 
+# texture colours for the network's lines
+UNCONNECTED_PIXEL = [64, 64, 64]  # unconnected, grey
+NOR_LOW_PIXEL = [0, 128, 0]  # gate off, dark green
+NOR_HIGH_PIXEL = [0, 255, 0]  # gate on, bright green
+OTHER_LOW_PIXEL = [0, 0, 128]  # clock off, dark blue
+OTHER_HIGH_PIXEL = [0, 0, 255]  # clock on, bight blue
+
 UP, DOWN, LEFT, RIGHT, FRONT, BACK = range(6)
 
 FACE_NAMES = [
@@ -170,23 +177,35 @@ class Model(object):
         self._shown = {}
 
         self.network = core.Network()
+        self._changes = self.network.subscribe()
+
+        # The texture's pixels, rebuilt when blocks are added or removed and
+        # otherwise kept up to date from the network's changes.
+        self._pixels = None
 
         self._initialize()
 
     def get_pixels(self):
         return self.network.dump_values(
-            prefix=[64, 64, 64],  # unconnected, grey
-            nor_low=[0, 128, 0],  # gate off, dark green
-            nor_high=[0, 255, 0],  # gate on, bright green
-            other_low=[0, 0, 128],  # clock off, dark blue
-            other_high=[0, 0, 255],  # clock on, bight blue
+            list(UNCONNECTED_PIXEL), NOR_LOW_PIXEL, NOR_HIGH_PIXEL, OTHER_LOW_PIXEL, OTHER_HIGH_PIXEL,
         )
 
     def update_texture(self):
-        pixels = bytes(self.get_pixels())
+        changes = self.network.changes_since(self._changes)
+        if self._pixels is None:
+            self._pixels = bytearray(self.get_pixels())
+        else:
+            # only the gates that changed since the last frame need redrawing
+            for index, value in changes:
+                if self.network.get_type(index) == core.NOR:
+                    pixel = NOR_HIGH_PIXEL if value else NOR_LOW_PIXEL
+                else:
+                    pixel = OTHER_HIGH_PIXEL if value else OTHER_LOW_PIXEL
+                offset = 3 * (index + 1)  # after the unconnected one
+                self._pixels[offset:offset + 3] = bytes(pixel)
 #        width = len(pixels) // 3
         width = 1024
-        self.group.texture = image.ImageData(width, 1, 'RGB', pixels).get_texture()
+        self.group.texture = image.ImageData(width, 1, 'RGB', bytes(self._pixels)).get_texture()
 
     def _initialize(self):
         """ Initialize the world by placing all the blocks.
@@ -247,6 +266,7 @@ class Model(object):
 
         """
         print('add_block', position, block, FACES[orientation])
+        self._pixels = None
         if position in self.world:
             self.remove_block(position)
         self.world[position] = block
@@ -284,6 +304,7 @@ class Model(object):
 
         """
         print('remove_block', position)
+        self._pixels = None
         assert position in self.world
         block = self.world[position]
         index = self.line[position]
@@ -306,6 +327,20 @@ class Model(object):
         del self.line[position]
         self.hide_block(position)
 
+    def compact(self):
+        """ renumber the network's gates to close up the holes left by removed blocks """
+        mapping = self.network.compact()
+        for position, index in self.line.items():
+            if index != UNCONNECTED:
+                self.line[position] = mapping[index]
+        self.clock_index = mapping[self.clock_index]
+        # the pixels are laid out by gate index
+        self._pixels = None
+        # the texture coordinates come from the line
+        for position in list(self._shown):
+            self.hide_block(position)
+            self.show_block(position)
+
     def show_block(self, position):
         """ Show the block at the given `position`. This method assumes the
         block has already been added with add_block()